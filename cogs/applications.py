@@ -105,7 +105,7 @@ class ApplicationForm(Modal, title='Заявка в Price FamQ'):
         )
         
         # Получаем канал рассмотрения СНАЧАЛА
-        review_channel_id = self.config.get('review_channel_id')
+        review_channel_id = self.config.snapshot.review_channel_id
         review_channel = self.bot.get_channel(review_channel_id)
         
         if not review_channel:
@@ -116,7 +116,7 @@ class ApplicationForm(Modal, title='Заявка в Price FamQ'):
             return
         
         # Получаем ID ролей модераторов для упоминания
-        moderator_role_ids = self.config.get('moderator_role_ids', [])
+        moderator_role_ids = self.config.snapshot.moderator_role_ids
         mention_roles = []
 
         for role_id in moderator_role_ids:
@@ -155,7 +155,7 @@ class ApplicationForm(Modal, title='Заявка в Price FamQ'):
     
     async def _log_application(self, user: discord.User, status: str):
         """Логирование заявки"""
-        logs_channel_id = self.config.get('logs_channel_id')
+        logs_channel_id = self.config.snapshot.logs_channel_id
         if not logs_channel_id:
             return
         
@@ -242,7 +242,7 @@ class RejectReasonModal(Modal, title='Причина отклонения'):
     
     async def _log_action(self, moderator: discord.User, applicant: discord.User, action: str, reason: str = None):
         """Логирование действия модератора"""
-        logs_channel_id = self.config.get('logs_channel_id')
+        logs_channel_id = self.config.snapshot.logs_channel_id
         if not logs_channel_id:
             return
         
@@ -277,7 +277,7 @@ class ApplicationReviewView(View):
     
     def _check_permissions(self, interaction: discord.Interaction) -> bool:
         """Проверка прав на рассмотрение заявок"""
-        moderator_role_ids = self.config.get('moderator_role_ids', [])
+        moderator_role_ids = self.config.snapshot.moderator_role_ids
         return any(role.id in moderator_role_ids for role in interaction.user.roles)
     
     @discord.ui.button(label='📋 Рассмотреть', style=discord.ButtonStyle.primary, custom_id='review')
@@ -323,7 +323,7 @@ class ApplicationReviewView(View):
         member = guild.get_member(self.user_id)
         
         # Выдаем роль Price Academy
-        member_role_id = self.config.get('member_role_id')
+        member_role_id = self.config.snapshot.member_role_id
         if member and member_role_id:
             role = guild.get_role(member_role_id)
             if role:
@@ -396,7 +396,7 @@ class ApplicationReviewView(View):
     
     async def _log_action(self, moderator: discord.User, applicant_id: int, action: str):
         """Логирование действия модератора"""
-        logs_channel_id = self.config.get('logs_channel_id')
+        logs_channel_id = self.config.snapshot.logs_channel_id
         if not logs_channel_id:
             return
         
@@ -498,7 +498,7 @@ class Applications(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def clear_old_applications(self, ctx, limit: int = 50):
         """Очистить старые заявки с кнопками (Owner/Developer)"""
-        review_channel_id = self.config.get('review_channel_id')
+        review_channel_id = self.config.snapshot.review_channel_id
         
         if not review_channel_id:
             await ctx.send('❌ Канал рассмотрения не настроен!')
@@ -80,16 +80,10 @@ class ContractView(View):
     async def start_button(self, interaction: discord.Interaction, button: Button):
         """Кнопка начала контракта (только для Contract и Owner)"""
         # Проверяем права
-        contract_role_id = self.config.get('contract_role_id', 0)
-        owner_role_ids = self.config.get('owner_role_ids', [])
+        snapshot = self.config.snapshot
+        allowed_role_ids = snapshot.contract_role_ids | snapshot.owner_role_ids
         
-        user_role_ids = [role.id for role in interaction.user.roles]
-        
-        has_permission = False
-        if contract_role_id and contract_role_id in user_role_ids:
-            has_permission = True
-        if any(role_id in user_role_ids for role_id in owner_role_ids):
-            has_permission = True
+        has_permission = any(role.id in allowed_role_ids for role in interaction.user.roles)
         
         if not has_permission:
             await interaction.response.send_message(
@@ -288,7 +282,7 @@ class ContractPublishModal(Modal):
             chance = complete_parts[1]
             
             # Получаем канал Members
-            members_channel_id = self.config.get('contracts_members_channel_id', 0)
+            members_channel_id = self.config.snapshot.contracts_members_channel_id
             if not members_channel_id:
                 await interaction.response.send_message(
                     '❌ Канал Members не настроен!',
@@ -368,8 +362,8 @@ class ContractPublishModal(Modal):
             embed.set_footer(text='Price FamQ')
             
             # Получаем роли Family и Price Academy для упоминания
-            family_role_id = self.config.get('family_role_id', 0)
-            member_role_id = self.config.get('member_role_id', 0)
+            family_role_id = self.config.snapshot.family_role_id
+            member_role_id = self.config.snapshot.member_role_id
             
             role_mentions = []
             role_names = []
@@ -489,7 +483,7 @@ class Contracts(commands.Cog):
         if not self.pinned_message_id:
             return
         
-        contracts_channel_id = self.config.get('contracts_channel_id', 0)
+        contracts_channel_id = self.config.snapshot.contracts_channel_id
         if not contracts_channel_id or not self.pinned_message_id:
             return
         
@@ -9,11 +9,27 @@ class Help(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = ConfigManager()
+        
+        # Эмбед справки собирается один раз и сбрасывается при изменении конфигурации
+        self._help_embed = None
+        self.config.subscribe(self._on_config_change)
+    
+    async def cog_unload(self):
+        self.config.unsubscribe(self._on_config_change)
+    
+    def _on_config_change(self, config):
+        self._help_embed = None
     
     @commands.command(name='commands', aliases=['помощь'])
     async def help_command(self, ctx):
         """Показывает список всех команд бота"""
+        if self._help_embed is None:
+            self._help_embed = self._build_help_embed()
         
+        await ctx.send(embed=self._help_embed)
+    
+    def _build_help_embed(self) -> discord.Embed:
+        """Эмбед со списком всех команд"""
         embed = discord.Embed(
             title='📚 Справка по командам Price FamQ Bot',
             description='Все доступные команды для управления ботом',
@@ -105,7 +121,7 @@ class Help(commands.Cog):
             text='Price FamQ Bot • Создан для Price FamQ',
         )
         
-        await ctx.send(embed=embed)
+        return embed
     
     @commands.command(name='ping')
     async def ping_command(self, ctx):
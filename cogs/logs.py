@@ -1,14 +1,30 @@
 # -*- coding: utf-8 -*-
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from datetime import datetime, timedelta
+import asyncio
 import json
 import os
+import shutil
+from collections import Counter
+from utils.audit_index import AuditLogIndex
 from utils.config_manager import ConfigManager
+from utils.export_cache import ExportCache
+from utils.export_jobs import ExportScheduler
+from utils.log_delivery import EmbedBatcher, WebhookPool
+from utils.log_entry import LogEntry
+from utils.log_export import EXPORT_FORMATS
+from utils.log_store import LogStore
+from utils.log_writer import LogWriter
+from utils.message_cache import CachedMessage, MessageCache
 from utils.permissions import permissions
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+
+# Лимит загрузки, если команда вызвана не на сервере
+DEFAULT_FILESIZE_LIMIT = 10 * 1024 * 1024
+
+# Служебные записи самой выгрузки (тип, команда): каждый вызов пишет их в bot_logs,
+# поэтому они не меняют ключ кэша и не считаются новыми записями для режима new
+EXPORT_BOOKKEEPING = (('command_use', 'download_all_logs'), ('logs_download_full', None))
 
 class EnhancedLogs(commands.Cog):
     """Улучшенная система логирования с максимальной детализацией"""
@@ -18,26 +34,111 @@ class EnhancedLogs(commands.Cog):
         self.config = ConfigManager()
         self.logs_dir = "logs"
         
-        # Файлы логов
-        self.bot_logs_file = os.path.join(self.logs_dir, "bot_logs.json")
-        self.discord_logs_file = os.path.join(self.logs_dir, "discord_logs.json")
-        self.applications_file = os.path.join(self.logs_dir, "applications.json")
-        self.voice_sessions_file = os.path.join(self.logs_dir, "voice_sessions.json")
-        
         # Создаем папку
         if not os.path.exists(self.logs_dir):
             os.makedirs(self.logs_dir)
         
-        # Создаем файлы
-        for file in [self.bot_logs_file, self.discord_logs_file, self.applications_file, self.voice_sessions_file]:
-            if not os.path.exists(file):
-                with open(file, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
+        # Логи в посуточных сегментах SQLite со сроками хранения по типам
+        self.store = LogStore(
+            os.path.join(self.logs_dir, "segments"),
+            retention=self.config.get('logs.retention_days', {})
+        )
+        
+        # Источники логов
+        self.bot_logs_source = "bot_logs"
+        self.discord_logs_source = "discord_logs"
+        self.applications_source = "applications"
+        self.voice_sessions_source = "voice_sessions"
+        
+        # Переносим старые файлы в сегменты
+        self.store.import_database(os.path.join(self.logs_dir, "events.db"))
+        for source in self._log_sources():
+            for ext in ('.json', '.jsonl'):
+                self.store.import_legacy(source, os.path.join(self.logs_dir, source + ext))
+        
+        # Фоновая запись логов (очередь с групповой записью)
+        self.writer = LogWriter(
+            self.store,
+            flush_interval=self.config.get('logs.flush_interval', 0.5),
+            batch_size=self.config.get('logs.batch_size', 500),
+            queue_size=self.config.get('logs.queue_size', 10000)
+        )
+        
+        # Кэш готовых выгрузок (LRU по общему размеру)
+        self.export_cache = ExportCache(
+            os.path.join(self.logs_dir, "export_cache"),
+            max_bytes=self.config.get('logs.export_cache_mb', 100) * 1024 * 1024
+        )
+        
+        # Очередь выгрузок: лимит одновременных и склейка одинаковых
+        self.export_jobs = ExportScheduler(max_concurrent=self.config.get('logs.export_max_concurrent', 1))
+        
+        # Отметки "до какого ID пользователь уже выгрузил" для режима new
+        self.export_marks_file = os.path.join(self.logs_dir, "export_marks.json")
+        
+        # Эмбеды в канал логов уходят пачками до 10 в сообщении, важные - первыми
+        self.embed_batcher = EmbedBatcher(
+            self._deliver_embeds,
+            window=self.config.get('logs.embed_batch_window', 1.0),
+            burst_threshold=self.config.get('logs.embed_burst_threshold', 30),
+            priorities=self.config.get('logs.embed_priorities', {})
+        )
+        
+        # Пул вебхуков канала логов (0 - отправка обычными сообщениями)
+        webhook_pool_size = self.config.get('logs.webhook_pool_size', 0)
+        self.webhook_pool = WebhookPool(bot, webhook_pool_size) if webhook_pool_size > 0 else None
+        
+        # Журнал аудита из шлюза вместо запросов audit_logs() на каждое событие
+        self.audit_index = AuditLogIndex(ttl=self.config.get('logs.audit_ttl', 30.0))
+        
+        # Свой ограниченный кэш текста сообщений для raw-событий удаления/редактирования
+        self.message_cache = MessageCache(
+            max_size=self.config.get('logs.message_cache_size', 5000),
+            ttl=self.config.get('logs.message_cache_ttl_hours', 24) * 3600
+        )
         
         # Трекинг войс сессий
         self.voice_sessions = {}
+        
+        # Удаление и сжатие старых сегментов в фоне
+        self.expire_logs_task.start()
+    
+    async def cog_unload(self):
+        """Остановка таска, отправка накопленных эмбедов и запись остатка очереди при выгрузке модуля"""
+        self.expire_logs_task.cancel()
+        await self.embed_batcher.close()
+        await asyncio.to_thread(self.writer.close)
+    
+    def _logs_channel(self):
+        """Канал логов или None, если он не настроен или недоступен"""
+        logs_channel_id = self.config.snapshot.logs_channel_id
+        if not logs_channel_id:
+            return None
+        return self.bot.get_channel(logs_channel_id)
+    
+    def _log_sources(self):
+        """Все источники логов"""
+        return [self.bot_logs_source, self.discord_logs_source, self.applications_source, self.voice_sessions_source]
     
-    def add_log(self, log_file: str, log_type: str, data: dict, user=None, target=None, channel=None, executor=None):
+    @tasks.loop(hours=1)
+    async def expire_logs_task(self):
+        """Удаление старых сегментов целыми файлами и сжатие холодных - вне горячего пути"""
+        try:
+            removed = await asyncio.to_thread(self.store.expire)
+            if removed:
+                print(f"🧹 Удалено сегментов логов с истекшим сроком: {removed}")
+            
+            archived = await asyncio.to_thread(
+                self.store.archive,
+                self.config.get('logs.compress_after_days', 7),
+                self.config.get('logs.archive_codec', 'gz')
+            )
+            if archived:
+                print(f"🗜️ Сжато холодных сегментов логов: {archived}")
+        except Exception as e:
+            print(f"❌ Ошибка обслуживания логов: {e}")
+    
+    def add_log(self, source: str, log_type: str, data: dict, user=None, target=None, channel=None, executor=None):
         """
         Добавление ПОЛНОЙ записи в лог
         user - кто выполняет действие
@@ -45,47 +146,10 @@ class EnhancedLogs(commands.Cog):
         executor - кто модерирует (для банов и т.д.)
         """
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-            
-            log_entry = {
-                'id': len(logs) + 1,
-                'timestamp': datetime.now().isoformat(),
-                'date': datetime.now().strftime('%d.%m.%Y'),
-                'time': datetime.now().strftime('%H:%M:%S'),
-                'weekday': datetime.now().strftime('%A'),
-                'type': log_type,
-                
-                # Пользователь (кто делает)
-                'user_id': user.id if user else None,
-                'user_name': str(user) if user else None,
-                'user_nick': user.nick if hasattr(user, 'nick') else None,
-                'user_discriminator': user.discriminator if user else None,
-                
-                # Цель (на ком делают)
-                'target_id': target.id if target else None,
-                'target_name': str(target) if target else None,
-                'target_nick': target.nick if hasattr(target, 'nick') else None,
-                
-                # Модератор (кто модерирует)
-                'executor_id': executor.id if executor else None,
-                'executor_name': str(executor) if executor else None,
-                
-                # Канал
-                'channel_id': channel.id if channel else None,
-                'channel_name': str(channel) if channel else None,
-                'channel_type': str(channel.type) if channel else None,
-                
-                # Данные
-                'data': data
-            }
-            logs.append(log_entry)
-            
-            if len(logs) > 50000:
-                logs = logs[-50000:]
+            log_entry = LogEntry.create(log_type, data, user=user, target=target, channel=channel, executor=executor)
             
-            with open(log_file, 'w', encoding='utf-8') as f:
-                json.dump(logs, f, indent=2, ensure_ascii=False)
+            # Запись в базу выполнит фоновый поток
+            self.writer.put(source, log_entry)
         
         except Exception as e:
             print(f"❌ Ошибка при добавлении лога: {e}")
@@ -109,7 +173,7 @@ class EnhancedLogs(commands.Cog):
                 'channel_id': after.channel.id
             }
             
-            self.add_log(self.discord_logs_file, 'voice_join', {
+            self.add_log(self.discord_logs_source, 'voice_join', {
                 'channel': after.channel.name,
                 'channel_id': after.channel.id,
                 'session_id': session_id,
@@ -117,6 +181,7 @@ class EnhancedLogs(commands.Cog):
             }, user=member, channel=after.channel)
             
             await self._send_log_embed(
+                log_type='voice_join',
                 title='🎤 Вход в голосовой канал',
                 description=(
                     f"**Пользователь:** {member.mention}\n"
@@ -144,7 +209,7 @@ class EnhancedLogs(commands.Cog):
                 # Сохраняем сессию
                 self._save_voice_session(member, session, duration_seconds)
             
-            self.add_log(self.discord_logs_file, 'voice_leave', {
+            self.add_log(self.discord_logs_source, 'voice_leave', {
                 'channel': before.channel.name,
                 'channel_id': before.channel.id,
                 'duration': duration,
@@ -152,6 +217,7 @@ class EnhancedLogs(commands.Cog):
             }, user=member, channel=before.channel)
             
             await self._send_log_embed(
+                log_type='voice_leave',
                 title='🎤 Выход из голосового канала',
                 description=(
                     f"**Пользователь:** {member.mention}\n"
@@ -167,7 +233,7 @@ class EnhancedLogs(commands.Cog):
         
         # Перемещение между войсами
         elif before.channel != after.channel and before.channel and after.channel:
-            self.add_log(self.discord_logs_file, 'voice_move', {
+            self.add_log(self.discord_logs_source, 'voice_move', {
                 'from_channel': before.channel.name,
                 'from_channel_id': before.channel.id,
                 'to_channel': after.channel.name,
@@ -177,6 +243,7 @@ class EnhancedLogs(commands.Cog):
             }, user=member)
             
             await self._send_log_embed(
+                log_type='voice_move',
                 title='🔀 Перемещение в голосовом канале',
                 description=f"**Пользователь:** {member.mention}",
                 fields=[
@@ -190,13 +257,14 @@ class EnhancedLogs(commands.Cog):
         # Отключение/включение микрофона
         if before.self_mute != after.self_mute:
             status = "🔇 Выключил" if after.self_mute else "🎤 Включил"
-            self.add_log(self.discord_logs_file, 'voice_mute_toggle', {
+            self.add_log(self.discord_logs_source, 'voice_mute_toggle', {
                 'muted': after.self_mute,
                 'channel': after.channel.name if after.channel else None
             }, user=member, channel=after.channel)
             
             if after.channel:
                 await self._send_log_embed(
+                    log_type='voice_mute_toggle',
                     title=f'{status} микрофон',
                     description=(
                         f"**Пользователь:** {member.mention}\n"
@@ -209,7 +277,7 @@ class EnhancedLogs(commands.Cog):
         # Отключение/включение звука
         if before.self_deaf != after.self_deaf:
             status = "🔇 Выключил" if after.self_deaf else "🔊 Включил"
-            self.add_log(self.discord_logs_file, 'voice_deaf_toggle', {
+            self.add_log(self.discord_logs_source, 'voice_deaf_toggle', {
                 'deafened': after.self_deaf,
                 'channel': after.channel.name if after.channel else None
             }, user=member, channel=after.channel)
@@ -217,13 +285,14 @@ class EnhancedLogs(commands.Cog):
         # Видео
         if before.self_video != after.self_video:
             status = "📹 Включил" if after.self_video else "📴 Выключил"
-            self.add_log(self.discord_logs_file, 'voice_video_toggle', {
+            self.add_log(self.discord_logs_source, 'voice_video_toggle', {
                 'video_enabled': after.self_video,
                 'channel': after.channel.name if after.channel else None
             }, user=member, channel=after.channel)
             
             if after.channel:
                 await self._send_log_embed(
+                    log_type='voice_video_toggle',
                     title=f'{status} видео',
                     description=(
                         f"**Пользователь:** {member.mention}\n"
@@ -236,13 +305,14 @@ class EnhancedLogs(commands.Cog):
         # Стрим
         if before.self_stream != after.self_stream:
             status = "🔴 Начал" if after.self_stream else "⚫ Закончил"
-            self.add_log(self.discord_logs_file, 'voice_stream_toggle', {
+            self.add_log(self.discord_logs_source, 'voice_stream_toggle', {
                 'streaming': after.self_stream,
                 'channel': after.channel.name if after.channel else None
             }, user=member, channel=after.channel)
             
             if after.channel:
                 await self._send_log_embed(
+                    log_type='voice_stream_toggle',
                     title=f'{status} стрим',
                     description=(
                         f"**Пользователь:** {member.mention}\n"
@@ -268,10 +338,7 @@ class EnhancedLogs(commands.Cog):
     def _save_voice_session(self, member, session, duration_seconds):
         """Сохранение войс сессии"""
         try:
-            with open(self.voice_sessions_file, 'r', encoding='utf-8') as f:
-                sessions = json.load(f)
-            
-            sessions.append({
+            self.writer.put(self.voice_sessions_source, {
                 'user_id': member.id,
                 'user_name': str(member),
                 'channel': session['channel'],
@@ -280,9 +347,6 @@ class EnhancedLogs(commands.Cog):
                 'duration_seconds': duration_seconds,
                 'duration_formatted': self._format_duration(duration_seconds)
             })
-            
-            with open(self.voice_sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(sessions, f, indent=2, ensure_ascii=False)
         except Exception as e:
             print(f"❌ Ошибка сохранения сессии: {e}")
     
@@ -293,7 +357,7 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_invite_create(self, invite: discord.Invite):
         """Создание приглашений"""
-        self.add_log(self.discord_logs_file, 'invite_create', {
+        self.add_log(self.discord_logs_source, 'invite_create', {
             'code': invite.code,
             'url': invite.url,
             'channel': str(invite.channel),
@@ -303,6 +367,7 @@ class EnhancedLogs(commands.Cog):
         }, user=invite.inviter)
         
         await self._send_log_embed(
+            log_type='invite_create',
             title='🔗 Создано приглашение',
             description=f"**Создал:** {invite.inviter.mention if invite.inviter else 'Неизвестно'}",
             fields=[
@@ -318,7 +383,7 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_invite_delete(self, invite: discord.Invite):
         """Удаление приглашений"""
-        self.add_log(self.discord_logs_file, 'invite_delete', {
+        self.add_log(self.discord_logs_source, 'invite_delete', {
             'code': invite.code,
             'channel': str(invite.channel),
             'uses': invite.uses,
@@ -326,6 +391,7 @@ class EnhancedLogs(commands.Cog):
         })
         
         await self._send_log_embed(
+            log_type='invite_delete',
             title='🔗 Удалено приглашение',
             description=f"**Код:** `{invite.code}`",
             fields=[
@@ -339,38 +405,87 @@ class EnhancedLogs(commands.Cog):
     # ============================================================
     
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
-        """Удаление сообщений"""
-        if message.author.bot:
+    async def on_message(self, message: discord.Message):
+        """Снимок сообщения в свой кэш для логов удаления и редактирования"""
+        if message.guild is None:
             return
         
-        self.add_log(self.discord_logs_file, 'message_delete', {
-            'content': message.content[:500],
-            'content_length': len(message.content),
-            'attachments': [att.filename for att in message.attachments],
-            'embeds_count': len(message.embeds),
-            'mentions': [str(m) for m in message.mentions[:5]],
-            'message_id': message.id
-        }, user=message.author, channel=message.channel)
+        self.message_cache.add(message)
+    
+    def _message_snapshot(self, message_id: int, cached_message: discord.Message = None, pop: bool = False):
+        """Снимок из своего кэша, иначе из кэша discord.py (None - сообщения нет ни там, ни там)"""
+        snapshot = self.message_cache.pop(message_id) if pop else self.message_cache.get(message_id)
+        if snapshot is None and cached_message is not None:
+            snapshot = CachedMessage(cached_message, self.message_cache.content_limit)
+        return snapshot
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        """Удаление сообщений (в том числе отсутствующих во внутреннем кэше discord.py)"""
+        # Сообщение уже попало в запись массового удаления
+        if payload.guild_id is None or self.message_cache.in_bulk(payload.message_id):
+            return
+        
+        snapshot = self._message_snapshot(payload.message_id, payload.cached_message, pop=True)
+        if snapshot is not None and snapshot.author_bot:
+            return
+        
+        channel = self.bot.get_channel(payload.channel_id)
+        guild = self.bot.get_guild(payload.guild_id)
+        
+        if snapshot is None:
+            # Сообщение старше кэша - известно только где оно было
+            self.add_log(self.discord_logs_source, 'message_delete', {
+                'message_id': payload.message_id,
+                'cached': False
+            }, channel=channel)
+            
+            await self._send_log_embed(
+                log_type='message_delete',
+                title='🗑️ Сообщение удалено',
+                description=(
+                    f"**Канал:** <#{payload.channel_id}>\n"
+                    f"**ID сообщения:** `{payload.message_id}`"
+                ),
+                fields=[
+                    {'name': 'Содержание', 'value': '*Сообщения нет в кэше*', 'inline': False}
+                ],
+                color=0xF04747
+            )
+            return
+        
+        author = guild.get_member(snapshot.author_id) if guild else None
+        
+        self.add_log(self.discord_logs_source, 'message_delete', {
+            'content': snapshot.content[:500],
+            'content_length': len(snapshot.content),
+            'attachments': list(snapshot.attachments),
+            'embeds_count': snapshot.embeds_count,
+            'mentions': list(snapshot.mentions),
+            'message_id': snapshot.id,
+            'author_id': snapshot.author_id,
+            'author_name': snapshot.author_name
+        }, user=author, channel=channel)
         
         embed_desc = (
-            f"**Автор:** {message.author.mention}\n"
-            f"**Канал:** {message.channel.mention}\n"
-            f"**ID сообщения:** `{message.id}`"
+            f"**Автор:** <@{snapshot.author_id}>\n"
+            f"**Канал:** <#{payload.channel_id}>\n"
+            f"**ID сообщения:** `{snapshot.id}`"
         )
         
         fields = [
-            {'name': 'Содержание', 'value': message.content[:1000] if message.content else '*Пусто*', 'inline': False}
+            {'name': 'Содержание', 'value': snapshot.content[:1000] if snapshot.content else '*Пусто*', 'inline': False}
         ]
         
-        if message.attachments:
+        if snapshot.attachments:
             fields.append({
-                'name': f'Вложения ({len(message.attachments)})',
-                'value': '\n'.join([f'`{att.filename}`' for att in message.attachments[:5]]),
+                'name': f'Вложения ({len(snapshot.attachments)})',
+                'value': '\n'.join([f'`{filename}`' for filename in snapshot.attachments[:5]]),
                 'inline': False
             })
         
         await self._send_log_embed(
+            log_type='message_delete',
             title='🗑️ Сообщение удалено',
             description=embed_desc,
             fields=fields,
@@ -378,28 +493,117 @@ class EnhancedLogs(commands.Cog):
         )
     
     @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        """Редактирование сообщений"""
-        if before.author.bot or before.content == after.content:
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        """Массовое удаление (очистка канала): одна запись и один эмбед на всю пачку"""
+        if payload.guild_id is None:
+            return
+        
+        snapshots = self.message_cache.pop_bulk(payload.message_ids)
+        # Чего нет в своем кэше - берем из кэша discord.py
+        found = {snapshot.id for snapshot in snapshots}
+        for message in payload.cached_messages:
+            if message.id not in found:
+                snapshots.append(CachedMessage(message, self.message_cache.content_limit))
+        snapshots = sorted(
+            (snapshot for snapshot in snapshots if not snapshot.author_bot),
+            key=lambda snapshot: snapshot.id
+        )
+        
+        channel = self.bot.get_channel(payload.channel_id)
+        entry = await self._audit_entry(discord.AuditLogAction.message_bulk_delete, payload.channel_id)
+        executor = entry.user if entry else None
+        
+        self.add_log(self.discord_logs_source, 'message_bulk_delete', {
+            'count': len(payload.message_ids),
+            'cached': len(snapshots),
+            'messages': [
+                {
+                    'message_id': snapshot.id,
+                    'author_id': snapshot.author_id,
+                    'author_name': snapshot.author_name,
+                    'content': snapshot.content[:200],
+                    'attachments': list(snapshot.attachments)
+                }
+                for snapshot in snapshots
+            ]
+        }, channel=channel, executor=executor)
+        
+        authors = Counter(snapshot.author_id for snapshot in snapshots)
+        fields = []
+        if authors:
+            lines = [f'<@{author_id}> - {count}' for author_id, count in authors.most_common(10)]
+            if len(authors) > 10:
+                lines.append(f'...и еще {len(authors) - 10}')
+            fields.append({'name': 'Авторы', 'value': '\n'.join(lines), 'inline': False})
+        
+        await self._send_log_embed(
+            log_type='message_bulk_delete',
+            title='🧹 Массовое удаление сообщений',
+            description=(
+                f"**Канал:** <#{payload.channel_id}>\n"
+                f"**Модератор:** {executor.mention if executor else 'Неизвестно'}\n"
+                f"**Удалено:** {len(payload.message_ids)} (из кэша: {len(snapshots)})"
+            ),
+            fields=fields,
+            color=0xF04747
+        )
+    
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        """Редактирование сообщений (в том числе отсутствующих во внутреннем кэше discord.py)"""
+        if payload.guild_id is None:
+            return
+        
+        # MESSAGE_UPDATE приходит и на закрепление, превью ссылок, смену флагов -
+        # правка текста только та, у которой новое время редактирования
+        edited_at = discord.utils.parse_time(payload.data.get('edited_timestamp'))
+        if edited_at is None:
             return
         
-        self.add_log(self.discord_logs_file, 'message_edit', {
-            'before': before.content[:500],
-            'after': after.content[:500],
-            'message_id': after.id,
-            'jump_url': after.jump_url
-        }, user=before.author, channel=before.channel)
+        author_data = payload.data.get('author') or {}
+        if author_data.get('bot'):
+            return
+        
+        snapshot = self._message_snapshot(payload.message_id, payload.cached_message)
+        if snapshot is not None and snapshot.edited_at == edited_at:
+            return
+        
+        after_content = payload.data.get('content', '')
+        before_content = snapshot.content if snapshot else None
+        self.message_cache.update_content(payload.message_id, after_content, edited_at)
+        if before_content == after_content:
+            return
+        
+        channel = self.bot.get_channel(payload.channel_id)
+        guild = self.bot.get_guild(payload.guild_id)
+        author_id = int(author_data['id']) if author_data.get('id') else (snapshot.author_id if snapshot else None)
+        author = guild.get_member(author_id) if guild and author_id else None
+        jump_url = f'https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}'
+        
+        self.add_log(self.discord_logs_source, 'message_edit', {
+            'before': before_content[:500] if before_content is not None else None,
+            'after': after_content[:500],
+            'message_id': payload.message_id,
+            'jump_url': jump_url,
+            'cached': snapshot is not None
+        }, user=author, channel=channel)
+        
+        if before_content is None:
+            before_value = '*Сообщения нет в кэше*'
+        else:
+            before_value = before_content[:500] if before_content else '*Пусто*'
         
         await self._send_log_embed(
+            log_type='message_edit',
             title='✏️ Сообщение отредактировано',
             description=(
-                f"**Автор:** {before.author.mention}\n"
-                f"**Канал:** {before.channel.mention}\n"
-                f"**[Перейти к сообщению]({after.jump_url})**"
+                f"**Автор:** {f'<@{author_id}>' if author_id else 'Неизвестно'}\n"
+                f"**Канал:** <#{payload.channel_id}>\n"
+                f"**[Перейти к сообщению]({jump_url})**"
             ),
             fields=[
-                {'name': '📝 До', 'value': before.content[:500] if before.content else '*Пусто*', 'inline': False},
-                {'name': '📝 После', 'value': after.content[:500] if after.content else '*Пусто*', 'inline': False}
+                {'name': '📝 До', 'value': before_value, 'inline': False},
+                {'name': '📝 После', 'value': after_content[:500] if after_content else '*Пусто*', 'inline': False}
             ],
             color=0x5865F2
         )
@@ -408,28 +612,32 @@ class EnhancedLogs(commands.Cog):
     # МОДЕРАЦИЯ (КТО НА КОМ)
     # ============================================================
     
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        """Записи журнала аудита приходят событием - складываем в индекс для слушателей ниже"""
+        self.audit_index.add(entry)
+    
+    async def _audit_entry(self, action: discord.AuditLogAction, target_id: int):
+        """Запись журнала аудита для события (кто и почему) или None, если не пришла вовремя"""
+        return await self.audit_index.wait_for(
+            action, target_id, timeout=self.config.get('logs.audit_wait_timeout', 2.0)
+        )
+    
     @commands.Cog.listener()
     async def on_member_ban(self, guild: discord.Guild, user: discord.User):
         """Бан пользователя"""
         # Пытаемся найти кто забанил через audit log
-        executor = None
-        reason = None
+        entry = await self._audit_entry(discord.AuditLogAction.ban, user.id)
+        executor = entry.user if entry else None
+        reason = entry.reason if entry else None
         
-        try:
-            async for entry in guild.audit_logs(limit=5, action=discord.AuditLogAction.ban):
-                if entry.target.id == user.id:
-                    executor = entry.user
-                    reason = entry.reason
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'member_ban', {
+        self.add_log(self.discord_logs_source, 'member_ban', {
             'reason': reason or 'Не указана',
             'guild_name': guild.name
         }, user=user, executor=executor)
         
         await self._send_log_embed(
+            log_type='member_ban',
             title='🔨 Пользователь забанен',
             description=(
                 f"**Забанен:** {user.mention} (`{user.id}`)\n"
@@ -443,21 +651,15 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_member_unban(self, guild: discord.Guild, user: discord.User):
         """Разбан пользователя"""
-        executor = None
+        entry = await self._audit_entry(discord.AuditLogAction.unban, user.id)
+        executor = entry.user if entry else None
         
-        try:
-            async for entry in guild.audit_logs(limit=5, action=discord.AuditLogAction.unban):
-                if entry.target.id == user.id:
-                    executor = entry.user
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'member_unban', {
+        self.add_log(self.discord_logs_source, 'member_unban', {
             'guild_name': guild.name
         }, user=user, executor=executor)
         
         await self._send_log_embed(
+            log_type='member_unban',
             title='✅ Пользователь разбанен',
             description=(
                 f"**Разбанен:** {user.mention} (`{user.id}`)\n"
@@ -470,24 +672,17 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_member_kick(self, guild: discord.Guild, user: discord.User):
         """Кик пользователя"""
-        executor = None
-        reason = None
+        entry = await self._audit_entry(discord.AuditLogAction.kick, user.id)
+        executor = entry.user if entry else None
+        reason = entry.reason if entry else None
         
-        try:
-            async for entry in guild.audit_logs(limit=5, action=discord.AuditLogAction.kick):
-                if entry.target.id == user.id:
-                    executor = entry.user
-                    reason = entry.reason
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'member_kick', {
+        self.add_log(self.discord_logs_source, 'member_kick', {
             'reason': reason or 'Не указана',
             'guild_name': guild.name
         }, user=user, executor=executor)
         
         await self._send_log_embed(
+            log_type='member_kick',
             title='👢 Пользователь кикнут',
             description=(
                 f"**Кикнут:** {user.mention} (`{user.id}`)\n"
@@ -507,7 +702,7 @@ class EnhancedLogs(commands.Cog):
         """Вход участника"""
         account_age = (datetime.now() - member.created_at.replace(tzinfo=None)).days
         
-        self.add_log(self.discord_logs_file, 'member_join', {
+        self.add_log(self.discord_logs_source, 'member_join', {
             'account_created': member.created_at.isoformat(),
             'account_age_days': account_age,
             'is_bot': member.bot,
@@ -515,6 +710,7 @@ class EnhancedLogs(commands.Cog):
         }, user=member)
         
         await self._send_log_embed(
+            log_type='member_join',
             title='👋 Участник присоединился',
             description=f"**{member.mention}**",
             fields=[
@@ -531,7 +727,7 @@ class EnhancedLogs(commands.Cog):
         """Выход участника"""
         roles = [role.name for role in member.roles if role.name != "@everyone"]
         
-        self.add_log(self.discord_logs_file, 'member_leave', {
+        self.add_log(self.discord_logs_source, 'member_leave', {
             'roles': roles,
             'joined_at': member.joined_at.isoformat() if member.joined_at else None,
             'nickname': member.nick,
@@ -539,6 +735,7 @@ class EnhancedLogs(commands.Cog):
         }, user=member)
         
         await self._send_log_embed(
+            log_type='member_leave',
             title='👋 Участник покинул сервер',
             description=f"**{member.mention}**",
             fields=[
@@ -552,39 +749,93 @@ class EnhancedLogs(commands.Cog):
     
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
-        """Изменения участника"""
+        """Изменения участника: сначала дешевая классификация, I/O только для нужных классов"""
+        changes = self._classify_member_update(before, after)
+        if not changes:
+            # Аватар, буст, флаги и прочее - не логируем
+            return
         
-        # Изменение ника
+        # Ник и тайм-аут попадают в журнал аудита одной записью member_update
+        entry = None
+        if 'nick' in changes or 'timeout' in changes:
+            entry = await self._audit_entry(discord.AuditLogAction.member_update, after.id)
+        executor = entry.user if entry else None
+        
+        if 'nick' in changes:
+            await self._log_nick_change(before, after, executor)
+        if 'timeout' in changes:
+            await self._log_timeout(before, after, executor, entry.reason if entry else None)
+        if 'roles' in changes:
+            await self._log_role_changes(before, after)
+    
+    def _classify_member_update(self, before: discord.Member, after: discord.Member) -> set:
+        """Какие логируемые изменения есть: nick, roles, timeout (пустое множество - прочие)"""
+        changes = set()
         if before.nick != after.nick:
-            # Проверяем кто изменил через audit log
-            executor = None
-            try:
-                async for entry in after.guild.audit_logs(limit=5, action=discord.AuditLogAction.member_update):
-                    if entry.target.id == after.id:
-                        executor = entry.user
-                        break
-            except:
-                pass
-            
-            self.add_log(self.discord_logs_file, 'member_nick_change', {
-                'before': before.nick or before.name,
-                'after': after.nick or after.name
-            }, user=after, executor=executor)
-            
-            await self._send_log_embed(
-                title='📝 Изменение ника',
-                description=(
-                    f"**Пользователь:** {after.mention}\n"
-                    f"**Изменил:** {executor.mention if executor and executor != after else 'Сам'}"
-                ),
-                fields=[
-                    {'name': '📝 До', 'value': before.nick or before.name, 'inline': True},
-                    {'name': '📝 После', 'value': after.nick or after.name, 'inline': True}
-                ],
-                color=0x5865F2
+            changes.add('nick')
+        if before.timed_out_until != after.timed_out_until:
+            changes.add('timeout')
+        if before.roles != after.roles:
+            changes.add('roles')
+        return changes
+    
+    async def _log_nick_change(self, before: discord.Member, after: discord.Member, executor):
+        """Изменение ника"""
+        self.add_log(self.discord_logs_source, 'member_nick_change', {
+            'before': before.nick or before.name,
+            'after': after.nick or after.name
+        }, user=after, executor=executor)
+        
+        await self._send_log_embed(
+            log_type='member_nick_change',
+            title='📝 Изменение ника',
+            description=(
+                f"**Пользователь:** {after.mention}\n"
+                f"**Изменил:** {executor.mention if executor and executor != after else 'Сам'}"
+            ),
+            fields=[
+                {'name': '📝 До', 'value': before.nick or before.name, 'inline': True},
+                {'name': '📝 После', 'value': after.nick or after.name, 'inline': True}
+            ],
+            color=0x5865F2
+        )
+    
+    async def _log_timeout(self, before: discord.Member, after: discord.Member, executor, reason: str = None):
+        """Выдача и снятие тайм-аута"""
+        until = after.timed_out_until
+        
+        self.add_log(self.discord_logs_source, 'member_timeout', {
+            'until': until.isoformat() if until else None,
+            'reason': reason or 'Не указана'
+        }, user=after, executor=executor)
+        
+        if until:
+            title = '🔇 Тайм-аут выдан'
+            description = (
+                f"**Пользователь:** {after.mention}\n"
+                f"**До:** {discord.utils.format_dt(until, 'f')}\n"
+                f"**Модератор:** {executor.mention if executor else 'Неизвестно'}\n"
+                f"**Причина:** {reason or 'Не указана'}"
+            )
+        else:
+            title = '🔊 Тайм-аут снят'
+            description = (
+                f"**Пользователь:** {after.mention}\n"
+                f"**Модератор:** {executor.mention if executor else 'Неизвестно'}"
             )
         
-        # Изменение ролей
+        await self._send_log_embed(
+            log_type='member_timeout',
+            title=title,
+            description=description,
+            fields=[
+                {'name': 'ID пользователя', 'value': f'`{after.id}`', 'inline': True}
+            ],
+            color=0xFAA61A if until else 0x43B581
+        )
+    
+    async def _log_role_changes(self, before: discord.Member, after: discord.Member):
+        """Добавление и удаление ролей"""
         before_roles = set(before.roles)
         after_roles = set(after.roles)
         
@@ -592,25 +843,20 @@ class EnhancedLogs(commands.Cog):
         removed_roles = before_roles - after_roles
         
         # Кто добавил/удалил роли
-        executor = None
-        try:
-            async for entry in after.guild.audit_logs(limit=5, action=discord.AuditLogAction.member_role_update):
-                if entry.target.id == after.id:
-                    executor = entry.user
-                    break
-        except:
-            pass
+        entry = await self._audit_entry(discord.AuditLogAction.member_role_update, after.id)
+        executor = entry.user if entry else None
         
         # Добавление ролей
         for role in added_roles:
             if role.name != "@everyone":
-                self.add_log(self.discord_logs_file, 'member_role_add', {
+                self.add_log(self.discord_logs_source, 'member_role_add', {
                     'role_name': role.name,
                     'role_id': role.id,
                     'role_color': str(role.color)
                 }, user=after, executor=executor)
                 
                 await self._send_log_embed(
+                    log_type='member_role_add',
                     title='🎭 Роль добавлена',
                     description=(
                         f"**Пользователь:** {after.mention}\n"
@@ -627,12 +873,13 @@ class EnhancedLogs(commands.Cog):
         # Удаление ролей
         for role in removed_roles:
             if role.name != "@everyone":
-                self.add_log(self.discord_logs_file, 'member_role_remove', {
+                self.add_log(self.discord_logs_source, 'member_role_remove', {
                     'role_name': role.name,
                     'role_id': role.id
                 }, user=after, executor=executor)
                 
                 await self._send_log_embed(
+                    log_type='member_role_remove',
                     title='🎭 Роль удалена',
                     description=(
                         f"**Пользователь:** {after.mention}\n"
@@ -653,22 +900,17 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
         """Создание канала"""
-        executor = None
-        try:
-            async for entry in channel.guild.audit_logs(limit=5, action=discord.AuditLogAction.channel_create):
-                if entry.target.id == channel.id:
-                    executor = entry.user
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'channel_create', {
+        entry = await self._audit_entry(discord.AuditLogAction.channel_create, channel.id)
+        executor = entry.user if entry else None
+        
+        self.add_log(self.discord_logs_source, 'channel_create', {
             'channel_name': channel.name,
             'channel_type': str(channel.type),
             'category': channel.category.name if channel.category else None
         }, executor=executor)
         
         await self._send_log_embed(
+            log_type='channel_create',
             title='➕ Канал создан',
             description=(
                 f"**Канал:** {channel.mention}\n"
@@ -684,21 +926,16 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
         """Удаление канала"""
-        executor = None
-        try:
-            async for entry in channel.guild.audit_logs(limit=5, action=discord.AuditLogAction.channel_delete):
-                if entry.target.id == channel.id:
-                    executor = entry.user
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'channel_delete', {
+        entry = await self._audit_entry(discord.AuditLogAction.channel_delete, channel.id)
+        executor = entry.user if entry else None
+        
+        self.add_log(self.discord_logs_source, 'channel_delete', {
             'channel_name': channel.name,
             'channel_type': str(channel.type)
         }, executor=executor)
         
         await self._send_log_embed(
+            log_type='channel_delete',
             title='➖ Канал удален',
             description=(
                 f"**Канал:** {channel.name}\n"
@@ -718,16 +955,10 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_role_create(self, role: discord.Role):
         """Создание роли"""
-        executor = None
-        try:
-            async for entry in role.guild.audit_logs(limit=5, action=discord.AuditLogAction.role_create):
-                if entry.target.id == role.id:
-                    executor = entry.user
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'role_create', {
+        entry = await self._audit_entry(discord.AuditLogAction.role_create, role.id)
+        executor = entry.user if entry else None
+        
+        self.add_log(self.discord_logs_source, 'role_create', {
             'role_name': role.name,
             'role_id': role.id,
             'color': str(role.color),
@@ -735,6 +966,7 @@ class EnhancedLogs(commands.Cog):
         }, executor=executor)
         
         await self._send_log_embed(
+            log_type='role_create',
             title='🎭 Роль создана',
             description=(
                 f"**Роль:** {role.mention}\n"
@@ -750,21 +982,16 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role):
         """Удаление роли"""
-        executor = None
-        try:
-            async for entry in role.guild.audit_logs(limit=5, action=discord.AuditLogAction.role_delete):
-                if entry.target.id == role.id:
-                    executor = entry.user
-                    break
-        except:
-            pass
-        
-        self.add_log(self.discord_logs_file, 'role_delete', {
+        entry = await self._audit_entry(discord.AuditLogAction.role_delete, role.id)
+        executor = entry.user if entry else None
+        
+        self.add_log(self.discord_logs_source, 'role_delete', {
             'role_name': role.name,
             'role_id': role.id
         }, executor=executor)
         
         await self._send_log_embed(
+            log_type='role_delete',
             title='🎭 Роль удалена',
             description=(
                 f"**Роль:** {role.name}\n"
@@ -783,7 +1010,7 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_command(self, ctx):
         """Использование команд"""
-        self.add_log(self.bot_logs_file, 'command_use', {
+        self.add_log(self.bot_logs_source, 'command_use', {
             'command': ctx.command.name,
             'full_message': ctx.message.content,
             'args': str(ctx.args[2:]) if len(ctx.args) > 2 else '',
@@ -791,6 +1018,7 @@ class EnhancedLogs(commands.Cog):
         }, user=ctx.author, channel=ctx.channel)
         
         await self._send_log_embed(
+            log_type='command_use',
             title='⚡ Команда использована',
             description=(
                 f"**Пользователь:** {ctx.author.mention}\n"
@@ -806,7 +1034,7 @@ class EnhancedLogs(commands.Cog):
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
         """Ошибки команд"""
-        self.add_log(self.bot_logs_file, 'command_error', {
+        self.add_log(self.bot_logs_source, 'command_error', {
             'command': ctx.command.name if ctx.command else 'unknown',
             'error': str(error)[:500],
             'error_type': type(error).__name__
@@ -818,78 +1046,97 @@ class EnhancedLogs(commands.Cog):
     
     def log_application(self, user, data: dict):
         """Логирование заявки"""
-        self.add_log(self.applications_file, 'application_submit', data, user=user)
+        self.add_log(self.applications_source, 'application_submit', data, user=user)
     
     def log_application_review(self, executor, applicant, action: str, data: dict):
         """Логирование рассмотрения заявки"""
-        self.add_log(self.applications_file, f'application_{action}', data, user=applicant, executor=executor)
+        self.add_log(self.applications_source, f'application_{action}', data, user=applicant, executor=executor)
     
     # ============================================================
     # СКАЧИВАНИЕ ЛОГОВ
     # ============================================================
     
     @commands.command(name='download_all_logs')
-    async def download_all_logs(self, ctx, days: int = 30):
-        """Скачать ВСЕ логи в улучшенном Excel (Owner/Developer)"""
+    async def download_all_logs(self, ctx, days: int = 30, *options):
+        """
+        Скачать ВСЕ логи в улучшенном Excel (Owner/Developer)
+        !download_all_logs 30 new - только записи после вашей прошлой выгрузки
+        !download_all_logs 30 csv / ndjson - потоковые форматы со сжатием gzip
+        """
         if not permissions.can_use_all_commands(ctx.author):
             await ctx.send('❌ Нет прав! Требуется Owner или Developer.')
             return
         
-        await ctx.send('⏳ Создаю улучшенный многостраничный Excel файл...')
+        delta = 'new' in options
+        export_format = next((option for option in options if option in EXPORT_FORMATS), 'xlsx')
+        after_id = self._load_export_marks().get(str(ctx.author.id)) if delta else None
+        
+        if export_format == 'xlsx':
+            status = await ctx.send('⏳ Создаю улучшенный многостраничный Excel файл...')
+        else:
+            status = await ctx.send(f'⏳ Создаю выгрузку {export_format.upper()}...')
         
         try:
-            # Читаем логи
-            with open(self.bot_logs_file, 'r', encoding='utf-8') as f:
-                bot_logs = json.load(f)
-            
-            with open(self.discord_logs_file, 'r', encoding='utf-8') as f:
-                discord_logs = json.load(f)
-            
-            with open(self.applications_file, 'r', encoding='utf-8') as f:
-                applications = json.load(f)
-            
-            with open(self.voice_sessions_file, 'r', encoding='utf-8') as f:
-                voice_sessions = json.load(f)
+            # Дожидаемся записи очереди и пишем файлы потоково в отдельном потоке
+            await asyncio.to_thread(self.writer.flush)
             
-            # Фильтр по дням
             cutoff_date = datetime.now() - timedelta(days=days)
+            prefix = f"new_logs_{days}days" if delta else f"full_logs_{days}days"
+            max_bytes = ctx.guild.filesize_limit if ctx.guild else DEFAULT_FILESIZE_LIMIT
+            key, last_id, cached = await asyncio.to_thread(
+                self._cached_export, export_format, prefix, days, cutoff_date, after_id, max_bytes
+            )
             
-            bot_logs_filtered = [l for l in bot_logs if datetime.fromisoformat(l['timestamp']) > cutoff_date]
-            discord_logs_filtered = [l for l in discord_logs if datetime.fromisoformat(l['timestamp']) > cutoff_date]
-            applications_filtered = [l for l in applications if datetime.fromisoformat(l['timestamp']) > cutoff_date]
-            voice_sessions_filtered = [s for s in voice_sessions if datetime.fromisoformat(s['start_time']) > cutoff_date]
+            if delta and (last_id is None or (after_id is not None and last_id <= after_id)):
+                await status.edit(content='✅ Новых записей с прошлой выгрузки нет')
+                return
             
-            # Создаем Excel
-            filename = await self._create_enhanced_excel(
-                bot_logs_filtered,
-                discord_logs_filtered,
-                applications_filtered,
-                voice_sessions_filtered,
-                days
-            )
+            if cached:
+                paths, meta = cached
+                counts = meta['counts']
+            else:
+                # Одинаковые выгрузки склеиваются, одновременных - не больше лимита
+                paths, counts = await self.export_jobs.run(
+                    key, self._build_export, key, export_format, prefix, cutoff_date, after_id, last_id, max_bytes,
+                    message=status
+                )
             
             # Отправляем
+            if delta:
+                description = f'Новые записи с вашей прошлой выгрузки (за последние {days} дней)'
+            else:
+                description = f'Улучшенные логи за последние {days} дней'
             embed = discord.Embed(
                 title='📥 Полные логи готовы',
-                description=f'Улучшенные логи за последние {days} дней',
+                description=description,
                 color=0x43B581
             )
-            embed.add_field(name='📊 Логи бота', value=str(len(bot_logs_filtered)), inline=True)
-            embed.add_field(name='💬 Логи Discord', value=str(len(discord_logs_filtered)), inline=True)
-            embed.add_field(name='📋 Заявки', value=str(len(applications_filtered)), inline=True)
-            embed.add_field(name='🎤 Войс сессии', value=str(len(voice_sessions_filtered)), inline=True)
+            embed.add_field(name='📊 Логи бота', value=str(counts[self.bot_logs_source]), inline=True)
+            embed.add_field(name='💬 Логи Discord', value=str(counts[self.discord_logs_source]), inline=True)
+            embed.add_field(name='📋 Заявки', value=str(counts[self.applications_source]), inline=True)
+            embed.add_field(name='🎤 Войс сессии', value=str(counts[self.voice_sessions_source]), inline=True)
             embed.add_field(name='📄 Страниц', value='4', inline=True)
+            embed.add_field(name='🗂️ Формат', value=export_format, inline=True)
+            if len(paths) > 1:
+                embed.add_field(name='📦 Частей', value=str(len(paths)), inline=True)
             
-            await ctx.send(embed=embed, file=discord.File(filename))
+            # Части по порядку: в сообщении не больше 10 файлов и лимита сервера
+            for index, batch in enumerate(self._upload_batches(paths, max_bytes)):
+                files = [discord.File(path, filename=os.path.basename(path)) for path in batch]
+                await ctx.send(embed=embed if index == 0 else None, files=files)
             
-            os.remove(filename)
+            # Отметка для следующей выгрузки "new"
+            if last_id is not None:
+                self._save_export_mark(ctx.author.id, last_id)
             
-            self.add_log(self.bot_logs_file, 'logs_download_full', {
+            self.add_log(self.bot_logs_source, 'logs_download_full', {
                 'days': days,
-                'bot_logs': len(bot_logs_filtered),
-                'discord_logs': len(discord_logs_filtered),
-                'applications': len(applications_filtered),
-                'voice_sessions': len(voice_sessions_filtered)
+                'delta': delta,
+                'format': export_format,
+                'bot_logs': counts[self.bot_logs_source],
+                'discord_logs': counts[self.discord_logs_source],
+                'applications': counts[self.applications_source],
+                'voice_sessions': counts[self.voice_sessions_source]
             }, user=ctx.author)
         
         except Exception as e:
@@ -898,180 +1145,83 @@ class EnhancedLogs(commands.Cog):
             import traceback
             traceback.print_exc()
     
-    async def _create_enhanced_excel(self, bot_logs, discord_logs, applications, voice_sessions, days):
-        """Создание улучшенного Excel файла"""
-        filename = f"full_logs_{days}days.xlsx"
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)
-        
-        # Создаем страницы
-        self._create_bot_logs_page(wb, bot_logs)
-        self._create_discord_logs_page(wb, discord_logs)
-        self._create_applications_page(wb, applications)
-        self._create_voice_sessions_page(wb, voice_sessions)
-        
-        wb.save(filename)
-        return filename
-    
-    def _create_bot_logs_page(self, wb, logs):
-        """Страница: Логи бота"""
-        ws = wb.create_sheet("📊 Логи Бота")
-        
-        # Красивая шапка
-        header_fill = PatternFill(start_color="5865F2", end_color="5865F2", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=11)
-        border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
+    def _cached_export(self, export_format: str, prefix: str, days: int, cutoff_date: datetime,
+                       after_id: int = None, max_bytes: int = None):
+        """
+        Ключ выгрузки, последний ID в окне и готовые файлы из кэша, если они есть
+        (блокирующий вызов). Ключ - формат, префикс имен файлов (полная или новая
+        выгрузка), период и для каждого источника первый/последний ID и число записей:
+        пока записи в окне не менялись (новые меняют последний ID, удаленные по сроку
+        хранения - число), повторный запрос отдает готовые файлы.
+        Служебные записи самих выгрузок (EXPORT_BOOKKEEPING) не учитываются
+        """
+        summaries = [
+            self.store.source_summary(source, since=cutoff_date, exclude=EXPORT_BOOKKEEPING)
+            for source in self._log_sources()
+        ]
+        last_ids = [last for first, last, count in summaries if last is not None]
         
-        # Заголовки
-        headers = ['№', 'Дата', 'Время', 'День недели', 'Команда', 'Пользователь', 'ID пользователя', 'Канал', 'Полная команда', 'Результат']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = border
-        
-        # Данные
-        for idx, log in enumerate(logs, 2):
-            ws.cell(row=idx, column=1, value=log.get('id', idx-1)).border = border
-            ws.cell(row=idx, column=2, value=log.get('date', '')).border = border
-            ws.cell(row=idx, column=3, value=log.get('time', '')).border = border
-            ws.cell(row=idx, column=4, value=log.get('weekday', '')).border = border
-            ws.cell(row=idx, column=5, value=log.get('type', '')).border = border
-            ws.cell(row=idx, column=6, value=log.get('user_name', '')).border = border
-            ws.cell(row=idx, column=7, value=log.get('user_id', '')).border = border
-            ws.cell(row=idx, column=8, value=log.get('channel_name', '')).border = border
-            ws.cell(row=idx, column=9, value=log.get('data', {}).get('full_message', '')).border = border
-            ws.cell(row=idx, column=10, value='✅ Успех' if log.get('data', {}).get('success') else '❌ Ошибка').border = border
-        
-        # Автоширина
-        for col in range(1, len(headers) + 1):
-            max_length = len(headers[col-1])
-            for row in range(2, len(logs) + 2):
-                cell_value = str(ws.cell(row=row, column=col).value or '')
-                if len(cell_value) > max_length:
-                    max_length = len(cell_value)
-            ws.column_dimensions[get_column_letter(col)].width = min(max_length + 2, 50)
+        key = ExportCache.make_key(export_format, prefix, days, after_id, max_bytes, summaries)
+        return key, max(last_ids, default=None), self.export_cache.get(key)
     
-    def _create_discord_logs_page(self, wb, logs):
-        """Страница: Логи Discord"""
-        ws = wb.create_sheet("💬 Логи Discord")
-        
-        header_fill = PatternFill(start_color="2F3136", end_color="2F3136", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=11)
-        border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
-        
-        headers = ['№', 'Дата', 'Время', 'Тип', 'Пользователь (кто)', 'ID', 'Цель (на ком)', 'Модератор', 'Канал', 'Детали']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = border
-        
-        for idx, log in enumerate(logs, 2):
-            ws.cell(row=idx, column=1, value=log.get('id', idx-1)).border = border
-            ws.cell(row=idx, column=2, value=log.get('date', '')).border = border
-            ws.cell(row=idx, column=3, value=log.get('time', '')).border = border
-            ws.cell(row=idx, column=4, value=log.get('type', '')).border = border
-            ws.cell(row=idx, column=5, value=log.get('user_name', '')).border = border
-            ws.cell(row=idx, column=6, value=log.get('user_id', '')).border = border
-            ws.cell(row=idx, column=7, value=log.get('target_name', '')).border = border
-            ws.cell(row=idx, column=8, value=log.get('executor_name', '')).border = border
-            ws.cell(row=idx, column=9, value=log.get('channel_name', '')).border = border
-            ws.cell(row=idx, column=10, value=json.dumps(log.get('data', {}), ensure_ascii=False)[:200]).border = border
-        
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 20
+    def _build_export(self, key: str, export_format: str, prefix: str, cutoff_date: datetime,
+                      after_id: int, until_id: int, max_bytes: int, progress):
+        """
+        Новая выгрузка в личной временной папке, затем в кэш (в отдельном потоке).
+        Записи не новее until_id - последнего ID из ключа: то, что появится
+        во время выгрузки, попадет в следующую, а не в обе
+        """
+        temp_dir = self.export_cache.temp_dir(key)
+        try:
+            files, counts = EXPORT_FORMATS[export_format](
+                self.store, temp_dir, prefix, cutoff_date,
+                after_id=after_id, progress=progress, max_bytes=max_bytes, until_id=until_id
+            )
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        return self.export_cache.put(key, temp_dir, files, {'counts': counts}), counts
     
-    def _create_applications_page(self, wb, applications):
-        """Страница: Заявки"""
-        ws = wb.create_sheet("📋 Заявки")
-        
-        header_fill = PatternFill(start_color="43B581", end_color="43B581", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=11)
-        border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
-        
-        headers = ['№', 'Дата', 'Время', 'Действие', 'Заявитель', 'ID заявителя', 'Проверяющий', 'Детали']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = border
-        
-        for idx, log in enumerate(applications, 2):
-            ws.cell(row=idx, column=1, value=log.get('id', idx-1)).border = border
-            ws.cell(row=idx, column=2, value=log.get('date', '')).border = border
-            ws.cell(row=idx, column=3, value=log.get('time', '')).border = border
-            ws.cell(row=idx, column=4, value=log.get('type', '')).border = border
-            ws.cell(row=idx, column=5, value=log.get('user_name', '')).border = border
-            ws.cell(row=idx, column=6, value=log.get('user_id', '')).border = border
-            ws.cell(row=idx, column=7, value=log.get('executor_name', '')).border = border
-            ws.cell(row=idx, column=8, value=json.dumps(log.get('data', {}), ensure_ascii=False)[:200]).border = border
-        
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 20
+    def _upload_batches(self, paths: list, max_bytes: int):
+        """Разложить файлы по сообщениям: до 10 вложений и не больше max_bytes суммарно"""
+        batch = []
+        batch_size = 0
+        for path in paths:
+            size = os.path.getsize(path)
+            if batch and (len(batch) == 10 or batch_size + size > max_bytes):
+                yield batch
+                batch = []
+                batch_size = 0
+            batch.append(path)
+            batch_size += size
+        if batch:
+            yield batch
     
-    def _create_voice_sessions_page(self, wb, sessions):
-        """Страница: Голосовые сессии"""
-        ws = wb.create_sheet("🎤 Голосовые Сессии")
-        
-        header_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=11)
-        border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
-        
-        headers = ['№', 'Пользователь', 'Канал', 'Начало', 'Конец', 'Длительность', 'Секунд']
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = border
-        
-        for idx, session in enumerate(sessions, 2):
-            ws.cell(row=idx, column=1, value=idx-1).border = border
-            ws.cell(row=idx, column=2, value=session.get('user_name', '')).border = border
-            ws.cell(row=idx, column=3, value=session.get('channel', '')).border = border
-            ws.cell(row=idx, column=4, value=session.get('start_time', '')).border = border
-            ws.cell(row=idx, column=5, value=session.get('end_time', '')).border = border
-            ws.cell(row=idx, column=6, value=session.get('duration_formatted', '')).border = border
-            ws.cell(row=idx, column=7, value=session.get('duration_seconds', 0)).border = border
-        
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 25
+    def _load_export_marks(self) -> dict:
+        """Последний выгруженный ID по пользователям {user_id: id}"""
+        try:
+            with open(self.export_marks_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
     
-    async def _send_log_embed(self, title: str, description: str, fields: list, color: int, thumbnail: str = None):
-        """Отправка в канал логов"""
-        logs_channel_id = self.config.get('logs_channel_id')
-        if not logs_channel_id:
-            return
+    def _save_export_mark(self, user_id: int, last_id: int):
+        """Запомнить последний выгруженный пользователем ID"""
+        marks = self._load_export_marks()
+        marks[str(user_id)] = max(last_id, marks.get(str(user_id), 0))
         
-        logs_channel = self.bot.get_channel(logs_channel_id)
+        tmp_file = self.export_marks_file + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(marks, f)
+            os.replace(tmp_file, self.export_marks_file)
+        except OSError as e:
+            print(f"❌ Ошибка сохранения отметки выгрузки: {e}")
+    
+    async def _send_log_embed(self, title: str, description: str, fields: list, color: int, thumbnail: str = None,
+                              log_type: str = None):
+        """Отправка в канал логов (log_type определяет приоритет)"""
+        logs_channel = self._logs_channel()
         if not logs_channel:
             return
         
@@ -1092,10 +1242,20 @@ class EnhancedLogs(commands.Cog):
                 inline=field.get('inline', False)
             )
         
-        try:
-            await logs_channel.send(embed=embed)
-        except:
-            pass
+        # Отправку пачками выполнит EmbedBatcher
+        self.embed_batcher.add(embed, log_type=log_type)
+    
+    async def _deliver_embeds(self, embeds: list):
+        """Одно сообщение с пачкой эмбедов в канал логов"""
+        logs_channel = self._logs_channel()
+        if not logs_channel:
+            return
+        
+        # Через пул вебхуков, если он включен и доступен
+        if self.webhook_pool and await self.webhook_pool.send(logs_channel, embeds):
+            return
+        
+        await logs_channel.send(embeds=embeds)
 
 
 async def setup(bot):
@@ -14,10 +14,10 @@ class Welcome(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         """Приветствие нового участника"""
-        welcome_channel_id = self.config.get('welcome_channel_id')
+        welcome_channel_id = self.config.snapshot.welcome_channel_id
         
         # Автоматическая выдача роли Friends
-        auto_role_id = self.config.get('auto_role_id')
+        auto_role_id = self.config.snapshot.auto_role_id
         if auto_role_id:
             auto_role = member.guild.get_role(auto_role_id)
             if auto_role:
@@ -51,7 +51,7 @@ class Welcome(commands.Cog):
             f"╭─────────────────────╮\n"
             f"│  **📝 Хочешь вступить в семью?**  │\n"
             f"╰─────────────────────╯\n\n"
-            f"Подай заявку в <#{self.config.get('application_channel_id')}> и стань частью **Price Academy**!"
+            f"Подай заявку в <#{self.config.snapshot.application_channel_id}> и стань частью **Price Academy**!"
         )
         
         embed.description = welcome_text
@@ -96,7 +96,7 @@ class Welcome(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
         """Логирование выхода участника"""
-        logs_channel_id = self.config.get('logs_channel_id')
+        logs_channel_id = self.config.snapshot.logs_channel_id
         
         if not logs_channel_id:
             return
@@ -28,6 +28,9 @@ class PriceFamQBot(commands.Bot):
         
     async def setup_hook(self):
         """Загрузка всех cogs при запуске"""
+        # Правки config.json применяются без перезапуска
+        config.start_watcher(config.get('config_watch_interval', 5))
+        
         print("🔄 Загрузка модулей...")
         
         # Загрузка всех cogs из папки cogs
@@ -49,6 +52,12 @@ class PriceFamQBot(commands.Bot):
                 print(f"❌ Ошибка загрузки модуля {cog}: {e}")
         
         print("✅ Все модули загружены")
+    
+    async def close(self):
+        """Остановка наблюдения за конфигурацией и запись несохраненных изменений при выключении"""
+        config.stop_watcher()
+        await config.flush()
+        await super().close()
         
     async def on_ready(self):
         """Событие готовности бота"""
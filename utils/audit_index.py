@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Индекс записей журнала аудита Price FamQ Bot
+"""
+import asyncio
+import time
+
+import discord
+
+
+class AuditLogIndex:
+    """
+    Записи журнала аудита из события on_audit_log_entry_create по ключу
+    (action, target_id) с коротким временем жизни.
+    Слушатели событий ждут свою запись с таймаутом вместо запроса
+    guild.audit_logs() к API. Каждая запись выдается один раз.
+    """
+    
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._waiters = {}
+    
+    def add(self, entry: discord.AuditLogEntry) -> None:
+        """Новая запись из шлюза: отдать ожидающему или сохранить"""
+        target_id = getattr(entry.target, 'id', None)
+        if target_id is None:
+            return
+        key = (entry.action, target_id)
+        
+        waiters = self._waiters.get(key)
+        while waiters:
+            future = waiters.pop(0)
+            if not future.done():
+                future.set_result(entry)
+                return
+        
+        self._purge()
+        self._entries[key] = (time.monotonic(), entry)
+    
+    async def wait_for(self, action: discord.AuditLogAction, target_id: int, timeout: float = 2.0):
+        """Запись для (action, target_id) или None, если не пришла за timeout секунд"""
+        key = (action, target_id)
+        
+        cached = self._entries.pop(key, None)
+        if cached and time.monotonic() - cached[0] <= self.ttl:
+            return cached[1]
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters:
+                    del self._waiters[key]
+    
+    def _purge(self):
+        """Удалить записи старше ttl"""
+        deadline = time.monotonic() - self.ttl
+        for key in [key for key, (added, entry) in self._entries.items() if added < deadline]:
+            del self._entries[key]
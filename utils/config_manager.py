@@ -1,14 +1,48 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import json
 import os
-from typing import Any, Optional
+import shutil
+import tempfile
+from typing import Any, Callable, Optional
+
+from utils.config_snapshot import ConfigSnapshot
 
 class ConfigManager:
-    """Configuration manager for the bot"""
+    """
+    Configuration manager for the bot.
+    One shared instance per config file: ConfigManager() anywhere in the
+    process returns the already loaded config instead of re-reading the file.
+    """
+    
+    _instances = {}
+    
+    # Rapid set() calls are written to disk once, this many seconds after the first one
+    SAVE_DELAY = 0.5
+    
+    def __new__(cls, config_file: str = "config.json"):
+        path = os.path.abspath(config_file)
+        instance = cls._instances.get(path)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._initialized = False
+            cls._instances[path] = instance
+        return instance
     
     def __init__(self, config_file: str = "config.json"):
+        if self._initialized:
+            return
+        self._initialized = True
+        
         self.config_file = config_file
+        self._subscribers = []
+        self._watcher = None
+        self._file_signature = None
+        self._save_handle = None
+        self._save_task = None
         self.config = self.load_config()
+        # Immutable parsed view of self.config, replaced as a whole on every change
+        self.snapshot = ConfigSnapshot(self.config)
     
     def load_config(self) -> dict:
         """Load configuration from file"""
@@ -17,12 +51,32 @@ class ConfigManager:
             return self._create_default_config()
         
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self._read_file()
         except (json.JSONDecodeError, Exception) as e:
             print(f"Error reading {self.config_file}: {e}, creating new one...")
+            # Keep the unreadable file for manual recovery
+            try:
+                shutil.copyfile(self.config_file, self.config_file + '.broken')
+            except OSError:
+                pass
             return self._create_default_config()
     
+    def _read_file(self) -> dict:
+        """Parse the config file and remember its mtime/size"""
+        signature = self._stat()
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self._file_signature = signature
+        return config
+    
+    def _stat(self) -> Optional[tuple]:
+        """(mtime, size) of the config file, None if it is missing"""
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
     def _create_default_config(self) -> dict:
         """Create default configuration"""
         default_config = {
@@ -49,16 +103,78 @@ class ConfigManager:
         return default_config
     
     def save_config(self, config: Optional[dict] = None) -> None:
-        """Save configuration to file"""
+        """Save configuration to file (synchronously)"""
         if config is None:
             config = self.config
         
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4, ensure_ascii=False)
+            self._write_file(json.dumps(config, indent=4, ensure_ascii=False))
+        except Exception as e:
+            print(f"❌ Ошибка сохранения конфигурации: {e}")
+    
+    def _write_file(self, data: str) -> None:
+        """Atomic write: temp file next to the config, fsync, then rename over it"""
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.config_file):
+                shutil.copymode(self.config_file, tmp_path)
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        
+        # Our own write is not a change for the watcher
+        self._file_signature = self._stat()
+    
+    def _schedule_save(self) -> None:
+        """Debounced save off the event loop; without a running loop - save right away"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_config()
+            return
+        
+        if self._save_handle is None:
+            self._save_handle = loop.call_later(self.SAVE_DELAY, self._start_save)
+    
+    def _start_save(self) -> None:
+        self._save_handle = None
+        if self._save_task is not None and not self._save_task.done():
+            # Previous write is still running - try again later
+            self._schedule_save()
+            return
+        self._save_task = asyncio.create_task(self._save_async())
+    
+    async def _save_async(self) -> None:
+        # Serialize on the loop so the thread never sees a dict being changed
+        data = json.dumps(self.config, indent=4, ensure_ascii=False)
+        try:
+            await asyncio.to_thread(self._write_file, data)
         except Exception as e:
             print(f"❌ Ошибка сохранения конфигурации: {e}")
     
+    def _save_pending(self) -> bool:
+        return self._save_handle is not None or (self._save_task is not None and not self._save_task.done())
+    
+    async def flush(self) -> None:
+        """Write pending changes now (e.g. before shutdown)"""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            if self._save_task is not None:
+                await self._save_task
+            self._save_task = asyncio.create_task(self._save_async())
+        if self._save_task is not None:
+            await self._save_task
+    
     def get(self, key: str, default: Any = None) -> Any:
         """Get value from configuration"""
         keys = key.split('.')
@@ -83,17 +199,67 @@ class ConfigManager:
             config = config[k]
         
         config[keys[-1]] = value
-        self.save_config()
+        self._schedule_save()
+        self._notify()
     
     def get_color(self, color_name: str) -> int:
         """Get color from configuration"""
-        color = self.get(f'colors.{color_name}', '0xFFD700')
-        if isinstance(color, str):
-            # Убираем префикс 0x если есть
-            color_clean = color.replace('0x', '').replace('#', '')
-            return int(color_clean, 16)
-        return color
+        return self.snapshot.color(color_name)
     
     def reload(self) -> None:
         """Reload configuration"""
-        self.config = self.load_config()
\ No newline at end of file
+        self.config = self.load_config()
+        self._notify()
+    
+    def subscribe(self, callback: Callable[['ConfigManager'], Any]) -> None:
+        """Call callback(config) after every change (set or reload)"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[['ConfigManager'], Any]) -> None:
+        """Stop notifying callback (e.g. when a cog is unloaded)"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _notify(self) -> None:
+        """Rebuild the snapshot and notify subscribers about a config change"""
+        self.snapshot = ConfigSnapshot(self.config, self.snapshot.version + 1)
+        for callback in list(self._subscribers):
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"❌ Ошибка обработчика изменения конфигурации: {e}")
+    
+    def start_watcher(self, interval: float = 5.0) -> None:
+        """Start polling the config file mtime/size; hand edits are applied without a restart"""
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch(interval))
+    
+    def stop_watcher(self) -> None:
+        """Stop the config file watcher"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+    
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            # Our own save is about to overwrite the file anyway
+            if self._save_pending():
+                continue
+            
+            signature = self._stat()
+            if signature is None or signature == self._file_signature:
+                continue
+            
+            try:
+                config = self._read_file()
+            except (json.JSONDecodeError, OSError) as e:
+                # Half-saved or broken file: keep the current config until the next change
+                self._file_signature = signature
+                print(f"❌ Ошибка перезагрузки конфигурации: {e}")
+                continue
+            
+            self.config = config
+            print("🔄 Конфигурация перезагружена из файла")
+            self._notify()
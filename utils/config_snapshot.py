@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Разобранный снимок конфигурации Price FamQ Bot
+"""
+from types import MappingProxyType
+
+
+DEFAULT_COLOR = 0xFFD700
+
+
+def _parse_id(value) -> int:
+    """ID канала/роли из конфигурации (0 - не настроен)"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _parse_ids(value) -> frozenset:
+    """Множество ID ролей: в конфигурации бывает и список, и одиночный ID"""
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return frozenset(role_id for role_id in map(_parse_id, value) if role_id)
+
+
+def _parse_color(value) -> int:
+    """Цвет из строки вида '0x43B581' / '#43B581' или числа"""
+    if isinstance(value, str):
+        try:
+            return int(value.replace('0x', '').replace('#', ''), 16)
+        except ValueError:
+            return DEFAULT_COLOR
+    if isinstance(value, int):
+        return value
+    return DEFAULT_COLOR
+
+
+class ConfigSnapshot:
+    """
+    Неизменяемый снимок конфигурации, собранный один раз на каждую версию:
+    цвета уже числа, роли - frozenset, каналы - int (0 - не настроен).
+    ConfigManager подменяет снимок целиком при изменении конфигурации,
+    поэтому горячие пути просто читают атрибуты.
+    """
+    
+    CHANNEL_KEYS = (
+        'welcome_channel_id', 'application_channel_id', 'review_channel_id', 'logs_channel_id',
+        'contracts_channel_id', 'contracts_members_channel_id'
+    )
+    ROLE_KEYS = ('member_role_id', 'family_role_id', 'auto_role_id')
+    # Атрибут снимка -> ключ конфигурации
+    ROLE_SET_KEYS = {
+        'owner_role_ids': 'owner_role_ids',
+        'dep_owner_role_ids': 'dep_owner_role_ids',
+        'dev_role_ids': 'dev_role_ids',
+        'moderator_role_ids': 'moderator_role_ids',
+        'contract_role_ids': 'contract_role_id'
+    }
+    
+    __slots__ = ('version', 'prefix', 'logo_url', 'colors') + CHANNEL_KEYS + ROLE_KEYS + tuple(ROLE_SET_KEYS)
+    
+    def __init__(self, config: dict, version: int = 0):
+        values = {
+            'version': version,
+            'prefix': config.get('prefix', '!'),
+            'logo_url': config.get('logo_url'),
+            'colors': MappingProxyType({
+                name: _parse_color(value) for name, value in (config.get('colors') or {}).items()
+            })
+        }
+        for key in self.CHANNEL_KEYS + self.ROLE_KEYS:
+            values[key] = _parse_id(config.get(key))
+        for attr, key in self.ROLE_SET_KEYS.items():
+            values[attr] = _parse_ids(config.get(key))
+        
+        for attr, value in values.items():
+            object.__setattr__(self, attr, value)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('ConfigSnapshot is immutable')
+    
+    def __delattr__(self, name):
+        raise AttributeError('ConfigSnapshot is immutable')
+    
+    def color(self, name: str) -> int:
+        """Цвет по имени (как в разделе colors)"""
+        return self.colors.get(name, DEFAULT_COLOR)
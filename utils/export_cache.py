@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Дисковый кэш готовых выгрузок логов Price FamQ Bot
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+
+class ExportCache:
+    """
+    Готовые файлы выгрузок по ключу (формат, период, диапазон ID записей).
+    Пока новых записей нет, повторный запрос получает те же файлы.
+    Каждая выгрузка - папка с файлами и описанием <ключ>.json.
+    Старые выгрузки вытесняются по давности использования (LRU),
+    когда общий размер превышает max_bytes.
+    """
+    
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Ключ кэша из частей (например, формата, дней и диапазонов ID по источникам)"""
+        raw = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+    
+    def get(self, key: str):
+        """(пути к файлам, метаданные) или None; попадание обновляет время использования"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path + '.json', 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                os.utime(path)
+            except (OSError, json.JSONDecodeError):
+                return None
+        return [os.path.join(path, name) for name in meta['files']], meta
+    
+    def temp_dir(self, key: str) -> str:
+        """
+        Личная временная папка для новой выгрузки (внутри кэша,
+        чтобы put() перенес ее атомарно)
+        """
+        return tempfile.mkdtemp(prefix=f'{key}.', suffix='.tmp', dir=self.cache_dir)
+    
+    def put(self, key: str, temp_dir: str, files: list, meta: dict) -> list:
+        """Положить готовые файлы в кэш и вытеснить лишнее; возвращает пути в кэше"""
+        path = self._path(key)
+        meta = dict(meta, files=[os.path.basename(file) for file in files])
+        
+        with self._lock:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(temp_dir, path)
+            with open(path + '.json', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            self._evict(keep=path)
+        
+        return [os.path.join(path, name) for name in meta['files']]
+    
+    def _evict(self, keep: str) -> None:
+        """Удалять давно не использованные выгрузки, пока кэш больше лимита"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            entries.append((mtime, size, path))
+            total += size
+        
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path + '.json')
+            except OSError:
+                pass
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Очередь задач выгрузки логов Price FamQ Bot
+"""
+import asyncio
+
+import discord
+
+
+class ExportJob:
+    """Одна задача выгрузки: общий результат, счетчик записанных строк и текущий этап"""
+    
+    def __init__(self):
+        self.rows = 0
+        self.phase = None
+        self.started = False
+        self.future = None
+    
+    def add_rows(self, count: int, phase: str = None) -> None:
+        """Вызывается из рабочего потока по мере записи строк и при смене этапа"""
+        self.rows += count
+        if phase is not None:
+            self.phase = phase
+
+
+class ExportScheduler:
+    """
+    Ограничивает число одновременных выгрузок и склеивает одинаковые:
+    повторный запрос с тем же ключом ждет уже идущую задачу.
+    Пока задача идет, сообщение о ходе выгрузки редактируется.
+    """
+    
+    def __init__(self, max_concurrent: int = 1, progress_interval: float = 3.0):
+        self.progress_interval = progress_interval
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._jobs = {}
+    
+    async def run(self, key: str, func, *args, message: discord.Message = None):
+        """
+        Выполнить func(*args, progress) в отдельном потоке (или дождаться
+        такой же задачи) и вернуть ее результат
+        """
+        job = self._jobs.get(key)
+        if job is None:
+            job = ExportJob()
+            job.future = asyncio.ensure_future(self._execute(key, job, func, args))
+            self._jobs[key] = job
+        
+        return await self._wait(job, message)
+    
+    async def _execute(self, key: str, job: ExportJob, func, args):
+        try:
+            async with self._semaphore:
+                job.started = True
+                return await asyncio.to_thread(func, *args, job.add_rows)
+        finally:
+            self._jobs.pop(key, None)
+    
+    async def _wait(self, job: ExportJob, message: discord.Message):
+        """Ждать результат, обновляя сообщение с прогрессом"""
+        while True:
+            done, pending = await asyncio.wait({job.future}, timeout=self.progress_interval)
+            if done:
+                return job.future.result()
+            
+            if message is None:
+                continue
+            if job.started and job.phase:
+                content = f'⏳ Выгрузка логов: прочитано строк - {job.rows}, {job.phase}'
+            elif job.started:
+                content = f'⏳ Выгрузка логов: записано строк - {job.rows}'
+            else:
+                content = '⏳ Выгрузка логов в очереди, ждем завершения других выгрузок...'
+            try:
+                await message.edit(content=content)
+            except discord.HTTPException:
+                pass
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Доставка эмбедов в канал логов Price FamQ Bot
+"""
+import asyncio
+from collections import Counter, deque
+from datetime import datetime
+
+import discord
+
+
+# Лимиты Discord на одно сообщение
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+# Классы приоритета: важные события модерации уходят первыми и не сворачиваются,
+# фоновые при перегрузке сворачиваются в сводку
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_NAMES = {'high': PRIORITY_HIGH, 'normal': PRIORITY_NORMAL, 'low': PRIORITY_LOW}
+
+DEFAULT_PRIORITIES = {
+    'member_ban': PRIORITY_HIGH,
+    'member_unban': PRIORITY_HIGH,
+    'member_kick': PRIORITY_HIGH,
+    'member_role_add': PRIORITY_HIGH,
+    'member_role_remove': PRIORITY_HIGH,
+    'member_timeout': PRIORITY_HIGH,
+    'channel_delete': PRIORITY_HIGH,
+    'role_create': PRIORITY_HIGH,
+    'role_delete': PRIORITY_HIGH,
+    'message_bulk_delete': PRIORITY_HIGH,
+    'voice_join': PRIORITY_LOW,
+    'voice_leave': PRIORITY_LOW,
+    'voice_move': PRIORITY_LOW,
+    'voice_mute_toggle': PRIORITY_LOW,
+    'voice_deaf_toggle': PRIORITY_LOW,
+    'voice_video_toggle': PRIORITY_LOW,
+    'voice_stream_toggle': PRIORITY_LOW
+}
+
+
+class EmbedBatcher:
+    """
+    Очередь эмбедов с приоритетами перед каналом логов.
+    Эмбеды копятся короткое окно (важные будят отправку сразу) и уходят
+    пачками до 10 штук в сообщении, сначала более важные.
+    Если в очереди больше burst_threshold эмбедов, фоновые сворачиваются
+    в одну ожидающую сводку по видам событий (счетчики - в dropped), затем
+    так же обычные; важные не сворачиваются никогда. Сводка хранится вне
+    очередей и уходит после важных, поэтому сама повторно не сворачивается.
+    deliver(embeds) - корутина, отправляющая одно сообщение.
+    """
+    
+    def __init__(self, deliver, window: float = 1.0, burst_threshold: int = 30, priorities: dict = None):
+        self.deliver = deliver
+        self.window = window
+        self.burst_threshold = burst_threshold
+        self.priorities = dict(DEFAULT_PRIORITIES)
+        for log_type, name in (priorities or {}).items():
+            self.priorities[log_type] = PRIORITY_NAMES.get(name, PRIORITY_NORMAL)
+        
+        # Свернутые в сводки эмбеды по типам событий
+        self.dropped = Counter()
+        
+        self._queues = [deque(), deque(), deque()]
+        # Ожидающая отправки сводка: заголовок эмбеда -> сколько свернуто
+        self._summary_counts = Counter()
+        self._urgent = asyncio.Event()
+        self._task = None
+    
+    def add(self, embed: discord.Embed, log_type: str = None) -> None:
+        """Поставить эмбед в очередь на отправку (без ожидания сети)"""
+        priority = self.priorities.get(log_type, PRIORITY_NORMAL)
+        self._queues[priority].append((embed, log_type))
+        if priority == PRIORITY_HIGH:
+            self._urgent.set()
+        
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self) -> None:
+        """Отправить все, что накопилось (при выгрузке модуля)"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        await self._drain()
+    
+    def _pending(self) -> int:
+        return sum(len(queue) for queue in self._queues) + (1 if self._summary_counts else 0)
+    
+    async def _run(self):
+        while self._pending():
+            # Окно на накопление пачки; важное событие прерывает ожидание
+            if not self._queues[PRIORITY_HIGH]:
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+            self._urgent.clear()
+            await self._drain()
+    
+    async def _drain(self):
+        """Отправлять пачки, каждый раз начиная с самой важной непустой очереди"""
+        while self._pending():
+            self._shed_load()
+            if self._summary_counts and not self._queues[PRIORITY_HIGH]:
+                # Сводка уходит сразу после важных, вместе с началом обычных
+                batch = self._take_batch(self._queues[PRIORITY_NORMAL], [self._summary()])
+            else:
+                queue = next(queue for queue in self._queues if queue)
+                batch = self._take_batch(queue)
+            try:
+                await self.deliver(batch)
+            except Exception as e:
+                print(f"❌ Ошибка отправки логов в канал: {e}")
+    
+    def _shed_load(self):
+        """Перегрузка: свернуть фоновые, а если мало - и обычные эмбеды в сводку"""
+        for priority in (PRIORITY_LOW, PRIORITY_NORMAL):
+            if self._pending() <= self.burst_threshold:
+                return
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            
+            # Считаются только настоящие события, сводка в очередях не лежит
+            for embed, log_type in queue:
+                self.dropped[log_type or embed.title] += 1
+                self._summary_counts[embed.title or 'Без названия'] += 1
+            queue.clear()
+    
+    def _take_batch(self, queue: deque, batch: list = None) -> list:
+        """Пачка из начала очереди по лимитам сообщения: количество эмбедов и сумма символов"""
+        batch = batch or []
+        chars = sum(len(embed) for embed in batch)
+        while queue and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            size = len(queue[0][0])
+            if batch and chars + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(queue.popleft()[0])
+            chars += size
+        return batch
+    
+    def _summary(self) -> discord.Embed:
+        """Забрать ожидающую сводку: сколько событий какого вида свернуто"""
+        counts = self._summary_counts
+        self._summary_counts = Counter()
+        total = sum(counts.values())
+        lines = [f'**{count}×** {title}' for title, count in counts.most_common(20)]
+        if len(counts) > 20:
+            lines.append(f'...и еще {len(counts) - 20} видов событий')
+        
+        embed = discord.Embed(
+            title='📚 Сводка событий',
+            description=(
+                f'Канал логов перегружен: **{total}** событий показаны сводкой, '
+                f'подробности в выгрузке логов\n\n' + '\n'.join(lines)
+            ),
+            color=0x99AAB5,
+            timestamp=datetime.now()
+        )
+        embed.set_footer(text=f'Свернуто с запуска: {sum(self.dropped.values())}')
+        return embed
+
+
+class WebhookPool:
+    """
+    Пул вебхуков канала логов, используемых по кругу: у каждого вебхука
+    свой лимит запросов, и логи не занимают лимит сообщений бота.
+    Вебхуки создаются в канале при первой отправке и переиспользуются.
+    """
+    
+    WEBHOOK_NAME = 'Price FamQ Logs'
+    
+    def __init__(self, bot, size: int):
+        self.bot = bot
+        self.size = size
+        
+        self._channel_id = None
+        self._webhooks = []
+        self._next = 0
+        self._disabled = False
+    
+    async def send(self, channel: discord.TextChannel, embeds: list) -> bool:
+        """Отправить через вебхук; False - пул недоступен, нужно слать обычным сообщением"""
+        if self._disabled:
+            return False
+        
+        if self._channel_id != channel.id or not self._webhooks:
+            if not await self._prepare(channel):
+                return False
+        
+        webhook = self._webhooks[self._next % len(self._webhooks)]
+        self._next += 1
+        
+        try:
+            await webhook.send(
+                embeds=embeds,
+                username=self.bot.user.name,
+                avatar_url=self.bot.user.display_avatar.url
+            )
+        except discord.NotFound:
+            # Вебхук удалили - пересоберем пул при следующей отправке
+            self._webhooks = []
+            return False
+        return True
+    
+    async def _prepare(self, channel: discord.TextChannel) -> bool:
+        """Найти свои вебхуки в канале и создать недостающие"""
+        try:
+            webhooks = [
+                webhook for webhook in await channel.webhooks()
+                if webhook.name == self.WEBHOOK_NAME and webhook.user and webhook.user.id == self.bot.user.id
+            ]
+            while len(webhooks) < self.size:
+                webhooks.append(await channel.create_webhook(name=self.WEBHOOK_NAME))
+        except discord.Forbidden:
+            print("❌ Нет права 'Управление вебхуками' в канале логов, логи идут обычными сообщениями")
+            self._disabled = True
+            return False
+        except discord.HTTPException as e:
+            print(f"❌ Ошибка подготовки вебхуков канала логов: {e}")
+            return False
+        
+        self._channel_id = channel.id
+        self._webhooks = webhooks[:self.size]
+        return True
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Компактная запись лога Price FamQ Bot
+"""
+import time
+from datetime import datetime
+
+
+class LogEntry:
+    """
+    Запись лога: время хранится одним целым числом (мс Unix),
+    дата/время/день недели вычисляются только при экспорте
+    """
+    
+    __slots__ = (
+        'id', 'ts', 'type',
+        'user_id', 'user_name',
+        'target_id', 'target_name',
+        'executor_id', 'executor_name',
+        'channel_id', 'channel_name', 'channel_type',
+        'data'
+    )
+    
+    def __init__(self, ts: int, type: str, data: dict = None, id: int = None,
+                 user_id: int = None, user_name: str = None,
+                 target_id: int = None, target_name: str = None,
+                 executor_id: int = None, executor_name: str = None,
+                 channel_id: int = None, channel_name: str = None, channel_type: str = None):
+        self.id = id
+        self.ts = ts
+        self.type = type
+        self.user_id = user_id
+        self.user_name = user_name
+        self.target_id = target_id
+        self.target_name = target_name
+        self.executor_id = executor_id
+        self.executor_name = executor_name
+        self.channel_id = channel_id
+        self.channel_name = channel_name
+        self.channel_type = channel_type
+        self.data = data if data is not None else {}
+    
+    @classmethod
+    def create(cls, log_type: str, data: dict, user=None, target=None, channel=None, executor=None) -> 'LogEntry':
+        """Запись о событии, произошедшем сейчас (одно обращение к часам)"""
+        return cls(
+            ts=time.time_ns() // 1_000_000,
+            type=log_type,
+            data=data,
+            user_id=user.id if user else None,
+            user_name=str(user) if user else None,
+            target_id=target.id if target else None,
+            target_name=str(target) if target else None,
+            executor_id=executor.id if executor else None,
+            executor_name=str(executor) if executor else None,
+            channel_id=channel.id if channel else None,
+            channel_name=str(channel) if channel else None,
+            channel_type=str(channel.type) if channel else None
+        )
+    
+    @classmethod
+    def from_record(cls, record: dict) -> 'LogEntry':
+        """Запись из хранилища (в том числе старого формата с ISO-строками)"""
+        ts = record.get('ts')
+        if ts is None and record.get('timestamp'):
+            ts = int(datetime.fromisoformat(record['timestamp']).timestamp() * 1000)
+        
+        return cls(ts=ts or 0, type=record.get('type'), data=record.get('data'), id=record.get('id'),
+                   **{field: record.get(field) for field in cls.__slots__[3:-1]})
+    
+    def to_record(self) -> dict:
+        """Словарь для хранилища: только заполненные поля, без ID"""
+        record = {}
+        for field in self.__slots__[1:]:
+            value = getattr(self, field)
+            if value is not None:
+                record[field] = value
+        return record
+    
+    # ============================================================
+    # ПОЛЯ ДЛЯ ОТОБРАЖЕНИЯ (вычисляются при экспорте)
+    # ============================================================
+    
+    @property
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.ts / 1000)
+    
+    @property
+    def timestamp(self) -> str:
+        return self.datetime.isoformat()
+    
+    @property
+    def date(self) -> str:
+        return self.datetime.strftime('%d.%m.%Y')
+    
+    @property
+    def time(self) -> str:
+        return self.datetime.strftime('%H:%M:%S')
+    
+    @property
+    def weekday(self) -> str:
+        return self.datetime.strftime('%A')
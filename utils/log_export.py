@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""
+Потоковый экспорт логов Price FamQ Bot (Excel, CSV, NDJSON)
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import pickle
+import tempfile
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from utils.log_entry import LogEntry
+
+
+# ============================================================
+# СТРОКИ СТРАНИЦ
+# ============================================================
+
+def _bot_log_row(number: int, log: LogEntry) -> list:
+    return [
+        log.id, log.date, log.time, log.weekday, log.type,
+        log.user_name, log.user_id, log.channel_name,
+        log.data.get('full_message', ''),
+        '✅ Успех' if log.data.get('success') else '❌ Ошибка'
+    ]
+
+
+def _discord_log_row(number: int, log: LogEntry) -> list:
+    return [
+        log.id, log.date, log.time, log.type,
+        log.user_name, log.user_id, log.target_name, log.executor_name, log.channel_name,
+        json.dumps(log.data, ensure_ascii=False)[:200]
+    ]
+
+
+def _application_row(number: int, log: LogEntry) -> list:
+    return [
+        log.id, log.date, log.time, log.type,
+        log.user_name, log.user_id, log.executor_name,
+        json.dumps(log.data, ensure_ascii=False)[:200]
+    ]
+
+
+def _voice_session_row(number: int, session: dict) -> list:
+    return [
+        number,
+        session.get('user_name', ''),
+        session.get('channel', ''),
+        session.get('start_time', ''),
+        session.get('end_time', ''),
+        session.get('duration_formatted', ''),
+        session.get('duration_seconds', 0)
+    ]
+
+
+# Страницы выгрузки: источник, оформление шапки, колонки (заголовки для
+# Excel/CSV и ключи для NDJSON) и построитель строки
+SHEETS = [
+    {
+        'source': 'bot_logs',
+        'title': '📊 Логи Бота',
+        'color': '5865F2',
+        'headers': ['№', 'Дата', 'Время', 'День недели', 'Команда', 'Пользователь', 'ID пользователя', 'Канал', 'Полная команда', 'Результат'],
+        'fields': ['id', 'date', 'time', 'weekday', 'type', 'user_name', 'user_id', 'channel_name', 'full_message', 'result'],
+        'row': _bot_log_row,
+        'entries': True
+    },
+    {
+        'source': 'discord_logs',
+        'title': '💬 Логи Discord',
+        'color': '2F3136',
+        'headers': ['№', 'Дата', 'Время', 'Тип', 'Пользователь (кто)', 'ID', 'Цель (на ком)', 'Модератор', 'Канал', 'Детали'],
+        'fields': ['id', 'date', 'time', 'type', 'user_name', 'user_id', 'target_name', 'executor_name', 'channel_name', 'details'],
+        'row': _discord_log_row,
+        'entries': True
+    },
+    {
+        'source': 'applications',
+        'title': '📋 Заявки',
+        'color': '43B581',
+        'headers': ['№', 'Дата', 'Время', 'Действие', 'Заявитель', 'ID заявителя', 'Проверяющий', 'Детали'],
+        'fields': ['id', 'date', 'time', 'type', 'user_name', 'user_id', 'executor_name', 'details'],
+        'row': _application_row,
+        'entries': True
+    },
+    {
+        'source': 'voice_sessions',
+        'title': '🎤 Голосовые Сессии',
+        'color': 'FF0000',
+        'headers': ['№', 'Пользователь', 'Канал', 'Начало', 'Конец', 'Длительность', 'Секунд'],
+        'fields': ['number', 'user_name', 'channel', 'start_time', 'end_time', 'duration', 'duration_seconds'],
+        'row': _voice_session_row,
+        'entries': False
+    }
+]
+
+
+# ============================================================
+# СТИЛИ
+# ============================================================
+
+_THIN = Side(style='thin', color='000000')
+_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+
+CELL_STYLE = 'log_cell'
+MAX_COLUMN_WIDTH = 50
+PROGRESS_EVERY = 1000
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+GZIP_LEVEL = 6
+SPLIT_MARGIN = 1024 * 1024
+ROLL_CHECK_EVERY = 256
+
+
+def _header_style_name(color: str) -> str:
+    return f'log_header_{color}'
+
+
+def _register_styles(wb) -> None:
+    """Общие именованные стили: один объект на книгу вместо рамки на каждую ячейку"""
+    wb.add_named_style(NamedStyle(name=CELL_STYLE, border=_BORDER))
+    
+    for color in {sheet['color'] for sheet in SHEETS}:
+        wb.add_named_style(NamedStyle(
+            name=_header_style_name(color),
+            fill=PatternFill(start_color=color, end_color=color, fill_type='solid'),
+            font=Font(color='FFFFFF', bold=True, size=11),
+            alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+            border=_BORDER
+        ))
+
+
+# ============================================================
+# ЭКСПОРТ
+# ============================================================
+
+def sheet_rows(store, sheet: dict, since, after_id: int = None, until_id: int = None):
+    """
+    Генератор строк страницы прямо из хранилища (after_id - только записи новее,
+    until_id - не новее: записи, появившиеся во время выгрузки, в нее не попадают)
+    """
+    records = store.query(sheet['source'], since=since, after_id=after_id, until_id=until_id)
+    for number, record in enumerate(records, 1):
+        if sheet['entries']:
+            record = LogEntry.from_record(record)
+        yield sheet['row'](number, record)
+
+
+def export_xlsx(store, directory: str, prefix: str, since, after_id: int = None,
+                progress=None, max_bytes: int = None, until_id: int = None) -> tuple:
+    """
+    Все страницы в файле Excel в потоковом режиме openpyxl (память не растет
+    с числом строк). Если файл больше max_bytes, строки делятся по диапазонам
+    на несколько книг с теми же страницами
+    """
+    counts = {}
+    prepared = []
+    try:
+        for sheet in SHEETS:
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+            rows = _counted(sheet_rows(store, sheet, since, after_id, until_id), progress)
+            count, widths = _spool_rows(spool, rows, sheet['headers'])
+            counts[sheet['source']] = count
+            prepared.append((spool, sheet, count, [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]))
+        
+        total = sum(counts.values())
+        files = _write_workbooks(directory, prefix, prepared, rows_per_part=None,
+                                 progress=progress, phase='сборка книги Excel')
+        
+        # Не влезло - делим строки по оценке размера строки (без постоянной
+        # части книги: стили и пустые страницы) и повторяем, пока каждая
+        # часть не окажется в лимите
+        rows_per_part = max(total, 1)
+        overhead = None
+        while max_bytes and any(os.path.getsize(file) > max_bytes for file in files):
+            if overhead is None:
+                overhead = _workbook_overhead(directory, prefix, prepared)
+            largest = max(os.path.getsize(file) for file in files)
+            row_bytes = max(largest - overhead, 1) / rows_per_part
+            estimate = int((max_bytes * 0.9 - overhead) / row_bytes)
+            if rows_per_part == 1 or estimate < 1:
+                raise ValueError(
+                    f'Книга Excel не помещается в лимит {max_bytes} байт даже по одной строке, '
+                    f'выберите формат csv или ndjson'
+                )
+            rows_per_part = min(estimate, rows_per_part - 1)
+            for file in files:
+                os.remove(file)
+            files = _write_workbooks(directory, prefix, prepared, rows_per_part=rows_per_part,
+                                     progress=progress, phase=f'деление на части по {rows_per_part} строк')
+    finally:
+        for spool, sheet, count, widths in prepared:
+            spool.close()
+    
+    return files, counts
+
+
+def _write_workbooks(directory: str, prefix: str, prepared: list, rows_per_part: int = None,
+                     progress=None, phase: str = None) -> list:
+    """
+    Переписать подготовленные страницы [(spool, sheet, count, widths), ...]
+    в книги Excel, не больше rows_per_part строк в книге (None - одна книга).
+    Строки уже посчитаны при записи во временный файл, поэтому здесь
+    progress получает только этап phase с числом переписанных строк
+    """
+    files = []
+    wb = None
+    rows_in_part = 0
+    written = 0
+    total = sum(count for spool, sheet, count, widths in prepared)
+    
+    def new_workbook():
+        workbook = openpyxl.Workbook(write_only=True)
+        _register_styles(workbook)
+        return workbook
+    
+    def save(workbook):
+        filename = os.path.join(directory, _part_name(prefix, len(files) + 1, '.xlsx'))
+        workbook.save(filename)
+        files.append(filename)
+    
+    for spool, sheet, count, widths in prepared:
+        spool.seek(0)
+        unpickler = pickle.Unpickler(spool)
+        ws = None
+        
+        for _ in range(count):
+            if progress is not None and written % PROGRESS_EVERY == 0:
+                progress(0, f'{phase}: {written} из {total} строк')
+            if rows_per_part is not None and rows_in_part >= rows_per_part:
+                save(wb)
+                wb, ws, rows_in_part = None, None, 0
+            if wb is None:
+                wb = new_workbook()
+            if ws is None:
+                ws, cells = _create_sheet(wb, sheet, widths)
+            
+            for cell, value in zip(cells, unpickler.load()):
+                cell.value = value
+            ws.append(cells)
+            rows_in_part += 1
+            written += 1
+        
+        # Пустые страницы оставляем в текущей книге, чтобы структура была видна
+        if ws is None:
+            if wb is None:
+                wb = new_workbook()
+            _create_sheet(wb, sheet, widths)
+    
+    save(wb)
+    return files
+
+
+def _workbook_overhead(directory: str, prefix: str, prepared: list) -> int:
+    """Размер книги со всеми страницами, но без строк"""
+    empty = [(spool, sheet, 0, widths) for spool, sheet, count, widths in prepared]
+    files = _write_workbooks(directory, f'{prefix}_empty', empty)
+    try:
+        return sum(os.path.getsize(file) for file in files)
+    finally:
+        for file in files:
+            os.remove(file)
+
+
+def _create_sheet(wb, sheet: dict, widths: list) -> tuple:
+    """Страница с шириной колонок и шапкой; возвращает (лист, ячейки для строк)"""
+    ws = wb.create_sheet(sheet['title'])
+    
+    # В потоковом режиме ширины колонок пишутся до строк
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    
+    header_style = _header_style_name(sheet['color'])
+    ws.append([_styled(ws, header, header_style) for header in sheet['headers']])
+    
+    # Строка пишется в файл сразу при append, поэтому ячейки со стилем
+    # создаем один раз на колонку и только меняем в них значения
+    return ws, [_styled(ws, None, CELL_STYLE) for _ in sheet['headers']]
+
+
+def export_csv(store, directory: str, prefix: str, since, after_id: int = None,
+               progress=None, max_bytes: int = None, until_id: int = None) -> tuple:
+    """
+    Каждая страница - отдельный CSV со сжатием gzip, строки пишутся сразу из
+    хранилища. Части по max_bytes делятся на границе строк, шапка в каждой части
+    """
+    files = []
+    counts = {}
+    
+    for sheet in SHEETS:
+        header = io.StringIO()
+        csv.writer(header).writerow(sheet['headers'])
+        
+        parts = _GzipParts(directory, f"{prefix}_{sheet['source']}", '.csv.gz', max_bytes, header=header.getvalue())
+        try:
+            writer = csv.writer(parts)
+            count = 0
+            for row in _counted(sheet_rows(store, sheet, since, after_id, until_id), progress):
+                parts.row_boundary()
+                writer.writerow(row)
+                count += 1
+        finally:
+            parts.close()
+        
+        files.extend(parts.files)
+        counts[sheet['source']] = count
+    
+    return files, counts
+
+
+def export_ndjson(store, directory: str, prefix: str, since, after_id: int = None,
+                  progress=None, max_bytes: int = None, until_id: int = None) -> tuple:
+    """
+    Все страницы в NDJSON со сжатием gzip: объект на строку с полем source.
+    Части по max_bytes делятся на границе строк
+    """
+    counts = {}
+    parts = _GzipParts(directory, prefix, '.ndjson.gz', max_bytes)
+    
+    try:
+        for sheet in SHEETS:
+            fields = sheet['fields']
+            count = 0
+            for row in _counted(sheet_rows(store, sheet, since, after_id, until_id), progress):
+                parts.row_boundary()
+                record = {'source': sheet['source']}
+                record.update(zip(fields, row))
+                parts.write(json.dumps(record, ensure_ascii=False, default=str))
+                parts.write('\n')
+                count += 1
+            counts[sheet['source']] = count
+    finally:
+        parts.close()
+    
+    return parts.files, counts
+
+
+# Форматы выгрузки: функция записи (store, directory, prefix, since, after_id, progress, max_bytes, until_id)
+# (progress(число новых строк, этап=None))
+# -> (список файлов, число строк по источникам). Блокирующие - запускать в отдельном потоке
+EXPORT_FORMATS = {
+    'xlsx': export_xlsx,
+    'csv': export_csv,
+    'ndjson': export_ndjson
+}
+
+
+def _part_name(prefix: str, number: int, ext: str) -> str:
+    """Имя части: первая без номера, дальше _part2, _part3..."""
+    return f'{prefix}{ext}' if number == 1 else f'{prefix}_part{number}{ext}'
+
+
+class _GzipParts:
+    """
+    Текстовый поток в gzip-файлы: на границе строк переходит в новую часть,
+    когда сжатый размер подходит к max_bytes (с запасом на буферы сжатия)
+    """
+    
+    def __init__(self, directory: str, name: str, ext: str, max_bytes: int = None, header: str = ''):
+        self.directory = directory
+        self.name = name
+        self.ext = ext
+        self.header = header
+        self.limit = max_bytes - min(SPLIT_MARGIN, max_bytes // 10) if max_bytes else None
+        self.files = []
+        self._rows = 0
+        self._open_part()
+    
+    def _open_part(self):
+        filename = os.path.join(self.directory, _part_name(self.name, len(self.files) + 1, self.ext))
+        self._raw = open(filename, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=GZIP_LEVEL)
+        self._text = io.TextIOWrapper(self._gzip, encoding='utf-8', newline='')
+        self.files.append(filename)
+        if self.header:
+            self._text.write(self.header)
+    
+    def write(self, text: str):
+        self._text.write(text)
+    
+    def row_boundary(self):
+        """Вызывать перед каждой строкой: при подходе к лимиту начинается новая часть"""
+        self._rows += 1
+        if self.limit is None or self._rows % ROLL_CHECK_EVERY:
+            return
+        if self._raw.tell() >= self.limit:
+            self.close()
+            self._open_part()
+    
+    def close(self):
+        self._text.close()
+        self._raw.close()
+
+
+def _counted(rows, progress):
+    """
+    Пробросить строки, сообщая progress(n) о каждых PROGRESS_EVERY строках.
+    progress(0, phase) - только сменить текущий этап (без новых строк)
+    """
+    if progress is None:
+        yield from rows
+        return
+    
+    pending = 0
+    for row in rows:
+        yield row
+        pending += 1
+        if pending == PROGRESS_EVERY:
+            progress(pending)
+            pending = 0
+    progress(pending)
+
+
+def _spool_rows(spool, rows, headers: list) -> tuple:
+    """
+    Один проход по строкам: складываем их во временный файл и попутно
+    считаем ширину колонок (текущий максимум длины значения).
+    Возвращает (число строк, ширины)
+    """
+    widths = [len(header) for header in headers]
+    pickler = pickle.Pickler(spool, protocol=pickle.HIGHEST_PROTOCOL)
+    count = 0
+    
+    for row in rows:
+        for col, value in enumerate(row):
+            if value is not None:
+                length = len(str(value))
+                if length > widths[col]:
+                    widths[col] = length
+        pickler.dump(row)
+        pickler.clear_memo()
+        count += 1
+    
+    return count, widths
+
+
+def _styled(ws, value, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
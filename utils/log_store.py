@@ -0,0 +1,718 @@
+# -*- coding: utf-8 -*-
+"""
+Хранилище логов Price FamQ Bot (посуточные сегменты SQLite с ретеншеном)
+"""
+import gzip
+import heapq
+import io
+import json
+import lzma
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from urllib.request import pathname2url
+
+from utils.log_entry import LogEntry
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    type TEXT,
+    user_id INTEGER,
+    target_id INTEGER,
+    channel_id INTEGER,
+    executor_id INTEGER,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS idx_events_source_ts ON events (source, ts);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (type, ts);
+CREATE INDEX IF NOT EXISTS idx_events_user_ts ON events (user_id, ts);
+CREATE INDEX IF NOT EXISTS idx_events_target_ts ON events (target_id, ts);
+CREATE INDEX IF NOT EXISTS idx_events_channel_ts ON events (channel_id, ts);
+'''
+
+FOREVER = 'forever'
+
+# Сжатые ("холодные") сегменты: JSON Lines в gzip или lzma
+ARCHIVE_CODECS = {
+    'gz': gzip.open,
+    'xz': lzma.open
+}
+FILTER_COLUMNS = ('source', 'type', 'user_id', 'target_id', 'channel_id')
+
+# Разреженный индекс архива: одна запись на блок из INDEX_INTERVAL строк
+INDEX_INTERVAL = 1000
+
+
+def to_epoch_ms(value) -> int:
+    """datetime или ISO-строка -> миллисекунды Unix"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp() * 1000)
+
+
+class LogStore:
+    """
+    Логи бота в посуточных файлах-сегментах SQLite (режим WAL, индексы).
+    Сегмент = один день + один класс хранения: logs/segments/2024-12-25.d7.db
+    Старые сегменты сжимаются в 2024-12-25.d7.jsonl.gz и читаются потоково;
+    рядом лежит разреженный индекс .idx (ts/ID -> смещение блока в файле,
+    плюс границы ID/ts и число записей каждого источника в блоке).
+    Истечение срока хранения - удаление файла целиком.
+    """
+    
+    def __init__(self, segments_dir: str, retention: dict = None):
+        self.segments_dir = segments_dir
+        self.retention = retention or {}
+        self.sequence_file = os.path.join(segments_dir, 'sequence')
+        self._local = threading.local()
+        self._id_lock = threading.Lock()
+        # Список сегментов и замена/удаление их файлов не пересекаются:
+        # читатель никогда не видит день наполовину сжатым
+        self._segments_lock = threading.RLock()
+        
+        os.makedirs(segments_dir, exist_ok=True)
+        self._last_id = self._load_last_id()
+    
+    # ============================================================
+    # СЕГМЕНТЫ
+    # ============================================================
+    
+    def retention_label(self, source: str, log_type: str = None) -> str:
+        """Класс хранения записи: 'd7' (7 дней) или 'forever'"""
+        days = self.retention.get('default')
+        for key in (source, log_type):
+            if key in self.retention:
+                days = self.retention[key]
+        return FOREVER if days is None else f'd{int(days)}'
+    
+    def _segment_path(self, day: date, label: str) -> str:
+        return os.path.join(self.segments_dir, f'{day.isoformat()}.{label}.db')
+    
+    def segments(self, since: datetime = None):
+        """Сегменты начиная с дня since: [(day, label, path), ...] по возрастанию дня"""
+        result = []
+        with self._segments_lock:
+            names = os.listdir(self.segments_dir)
+        for name in names:
+            parts = name.split('.')
+            is_hot = len(parts) == 3 and parts[2] == 'db'
+            is_cold = len(parts) == 4 and parts[2] == 'jsonl' and parts[3] in ARCHIVE_CODECS
+            if not (is_hot or is_cold):
+                continue
+            try:
+                day = date.fromisoformat(parts[0])
+            except ValueError:
+                continue
+            if since is not None and day < since.date():
+                continue
+            result.append((day, parts[1], os.path.join(self.segments_dir, name)))
+        return sorted(result)
+    
+    def _open(self, path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    def _open_ro(self, path: str) -> sqlite3.Connection:
+        """
+        Сегмент только для чтения: если файл успели сжать или удалить,
+        sqlite3.OperationalError, а не новый пустой файл на его месте
+        """
+        return sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?mode=ro', uri=True, timeout=30)
+    
+    def _archived_path(self, path: str):
+        """Архив горячего сегмента, сжатого после того, как его нашли в списке (None - нет)"""
+        base = path[:-len('.db')]
+        for codec in ARCHIVE_CODECS:
+            if os.path.exists(f'{base}.jsonl.{codec}'):
+                return f'{base}.jsonl.{codec}'
+        return None
+    
+    def _writer_conn(self, path: str) -> sqlite3.Connection:
+        """Открытые на запись сегменты текущего потока"""
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        if path not in conns:
+            conn = self._open(path)
+            conn.executescript(SCHEMA)
+            conns[path] = conn
+        return conns[path]
+    
+    def _close_unused(self, used: set) -> None:
+        """Закрыть сегменты, в которые больше не пишем (например, вчерашние)"""
+        conns = getattr(self._local, 'conns', {})
+        for path in list(conns):
+            if path not in used:
+                conns.pop(path).close()
+    
+    # ============================================================
+    # ПОСЛЕДОВАТЕЛЬНОСТЬ ID
+    # ============================================================
+    
+    def _load_last_id(self) -> int:
+        """Последний выданный ID: из файла последовательности и свежих сегментов"""
+        last_id = 0
+        try:
+            with open(self.sequence_file, 'r', encoding='utf-8') as f:
+                last_id = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            pass
+        
+        segments = self.segments()
+        if segments:
+            newest_day = segments[-1][0]
+            for day, label, path in segments:
+                if day == newest_day and path.endswith('.db'):
+                    conn = self._open_ro(path)
+                    try:
+                        row = conn.execute('SELECT MAX(id) FROM events').fetchone()
+                    finally:
+                        conn.close()
+                    last_id = max(last_id, row[0] or 0)
+        return last_id
+    
+    def _save_last_id(self) -> None:
+        tmp_file = self.sequence_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(str(self._last_id))
+        os.replace(tmp_file, self.sequence_file)
+    
+    # ============================================================
+    # ПЕРЕНОС СТАРЫХ ФАЙЛОВ
+    # ============================================================
+    
+    def import_legacy(self, source: str, path: str) -> None:
+        """Перенести старый файл (JSON-массив или JSON Lines) в сегменты"""
+        if not os.path.exists(path):
+            return
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.endswith('.jsonl'):
+                    logs = [json.loads(line) for line in f if line.strip()]
+                else:
+                    logs = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"❌ Ошибка чтения {path}: {e}")
+            return
+        
+        self.append_many([(source, entry) for entry in logs])
+        os.replace(path, path + '.bak')
+        print(f"✅ {path} перенесен в {self.segments_dir} ({len(logs)} записей)")
+    
+    def import_database(self, path: str) -> None:
+        """Перенести общую базу events.db в посуточные сегменты"""
+        if not os.path.exists(path):
+            return
+        
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute('SELECT source, record FROM events ORDER BY id').fetchall()
+        finally:
+            conn.close()
+        
+        self.append_many([(source, json.loads(record)) for source, record in rows])
+        os.replace(path, path + '.bak')
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        print(f"✅ {path} перенесен в {self.segments_dir} ({len(rows)} записей)")
+    
+    # ============================================================
+    # ЗАПИСЬ
+    # ============================================================
+    
+    def _row(self, row_id: int, source: str, entry: dict) -> tuple:
+        """Запись -> строка таблицы с индексируемыми колонками"""
+        entry = dict(entry)
+        entry.pop('id', None)
+        ts = entry.get('ts')
+        if ts is None:
+            # Старый формат и сессии: время ISO-строкой
+            timestamp = entry.get('timestamp') or entry.get('start_time')
+            ts = to_epoch_ms(timestamp) if timestamp else to_epoch_ms(datetime.now())
+        
+        return (
+            row_id,
+            source,
+            ts,
+            entry.get('type'),
+            entry.get('user_id'),
+            entry.get('target_id'),
+            entry.get('channel_id'),
+            entry.get('executor_id'),
+            json.dumps(entry, ensure_ascii=False)
+        )
+    
+    def _segment_day(self, entry: dict) -> date:
+        """День сегмента - день записи события (для сессий - день окончания)"""
+        if 'ts' in entry:
+            return date.fromtimestamp(entry['ts'] / 1000)
+        written = entry.get('timestamp') or entry.get('end_time')
+        return datetime.fromisoformat(written).date() if written else date.today()
+    
+    def append(self, source: str, entry) -> None:
+        """Добавить одну запись"""
+        self.append_many([(source, entry)])
+    
+    def append_many(self, items: list) -> None:
+        """
+        Добавить пачку записей [(source, entry), ...]: одна транзакция на сегмент.
+        entry - LogEntry или словарь (сессии, старые записи)
+        """
+        by_segment = {}
+        with self._id_lock:
+            for source, entry in items:
+                if isinstance(entry, LogEntry):
+                    entry = entry.to_record()
+                self._last_id += 1
+                path = self._segment_path(
+                    self._segment_day(entry),
+                    self.retention_label(source, entry.get('type'))
+                )
+                by_segment.setdefault(path, []).append(self._row(self._last_id, source, entry))
+            self._save_last_id()
+        
+        for path, rows in by_segment.items():
+            conn = self._writer_conn(path)
+            with conn:
+                conn.executemany(
+                    'INSERT INTO events (id, source, ts, type, user_id, target_id, channel_id, executor_id, record) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+        
+        self._close_unused(set(by_segment))
+    
+    # ============================================================
+    # ВЫБОРКА
+    # ============================================================
+    
+    def query(self, source: str = None, since: datetime = None, until: datetime = None,
+              type: str = None, user_id: int = None, target_id: int = None,
+              channel_id: int = None, after_id: int = None, until_id: int = None, limit: int = None):
+        """
+        Потоковая выборка записей по индексам: только сегменты нужных дней,
+        внутри дня - слияние классов хранения по ID.
+        Например: query(user_id=X, since=datetime.now() - timedelta(days=N))
+        """
+        filters = self._filters(source, since, until, type, user_id, target_id, channel_id, after_id, until_id)
+        
+        # Запись попадает в сегмент дня записи, который не раньше ее ts,
+        # поэтому достаточно сегментов начиная с дня since
+        by_day = {}
+        for day, label, path in self.segments(since=since):
+            by_day.setdefault(day, []).append(path)
+        
+        returned = 0
+        for day in sorted(by_day):
+            paths = by_day[day]
+            rows = heapq.merge(*(self._read_segment(path, filters, listed=paths) for path in paths))
+            for row_id, entry in rows:
+                entry['id'] = row_id
+                yield entry
+                
+                returned += 1
+                if limit is not None and returned >= limit:
+                    return
+    
+    def source_summary(self, source: str, since: datetime = None, exclude: tuple = ()) -> tuple:
+        """
+        Первый и последний ID и число записей источника за период
+        ((None, None, 0) - записей нет). Удаление записи по сроку хранения
+        меняет число записей, новая запись - последний ID.
+        Горячие сегменты отвечают по индексу SQLite, холодные - по сводке
+        источников в .idx; распаковываются только блоки на границе периода.
+        exclude - служебные записи, которые не учитываются в горячих сегментах:
+        [(тип, команда или None), ...]. Архивы не меняются, поэтому учитываются целиком
+        """
+        exclude_sql, exclude_params = self._exclude_clause(exclude)
+        filters = self._filters(source, since)
+        first = last = None
+        count = 0
+        
+        segments = self.segments(since=since)
+        listed = [path for day, label, path in segments]
+        for day, label, path in segments:
+            if path.endswith('.db'):
+                try:
+                    conn = self._open_ro(path)
+                except sqlite3.OperationalError:
+                    # Сегмент сжали после того, как он попал в список (или удалили по сроку)
+                    cold_path = self._archived_path(path)
+                    parts = []
+                    if cold_path is not None and cold_path not in listed:
+                        parts = self._archive_summary(cold_path, source, filters)
+                else:
+                    try:
+                        low, high, rows = conn.execute(
+                            'SELECT MIN(id), MAX(id), COUNT(*) FROM events WHERE source = ? AND ts > ?' + exclude_sql,
+                            [source, filters['since'] if filters['since'] is not None else -1] + exclude_params
+                        ).fetchone()
+                    finally:
+                        conn.close()
+                    parts = [(low, high, rows)]
+            else:
+                parts = self._archive_summary(path, source, filters)
+            
+            for low, high, rows in parts:
+                if not rows:
+                    continue
+                first = low if first is None else min(first, low)
+                last = high if last is None else max(last, high)
+                count += rows
+        
+        return first, last, count
+    
+    def _exclude_clause(self, exclude: tuple) -> tuple:
+        """Условие SQL, отбрасывающее записи [(тип, команда или None), ...]"""
+        sql = ''
+        params = []
+        for log_type, command in exclude:
+            if command is None:
+                sql += ' AND type IS NOT ?'
+                params.append(log_type)
+            else:
+                sql += " AND NOT (type IS ? AND json_extract(record, '$.data.command') IS ?)"
+                params.extend((log_type, command))
+        return sql, params
+    
+    def _archive_summary(self, path: str, source: str, filters: dict) -> list:
+        """[(первый ID, последний ID, число записей), ...] источника по блокам архива"""
+        blocks = self._load_index(path)
+        if blocks is None:
+            blocks = [{'offset': 0, 'size': os.path.getsize(path)}]
+        
+        parts = []
+        scan = []
+        for block in blocks:
+            if 'sources' not in block:
+                # Индекс старого формата - блок придется прочитать
+                scan.append(block)
+                continue
+            summary = block['sources'].get(source)
+            if summary is None:
+                continue
+            if filters['since'] is not None and summary['max_ts'] <= filters['since']:
+                continue
+            if filters['since'] is None or summary['min_ts'] > filters['since']:
+                parts.append((summary['first_id'], summary['last_id'], summary['count']))
+            else:
+                scan.append(block)
+        
+        if scan:
+            ids = [row_id for row_id, entry in self._scan_archive(path, filters, blocks=scan)]
+            if ids:
+                parts.append((min(ids), max(ids), len(ids)))
+        return parts
+    
+    def _filters(self, source: str = None, since: datetime = None, until: datetime = None,
+                 type: str = None, user_id: int = None, target_id: int = None,
+                 channel_id: int = None, after_id: int = None, until_id: int = None) -> dict:
+        return {
+            'source': source, 'type': type, 'user_id': user_id,
+            'target_id': target_id, 'channel_id': channel_id,
+            'since': to_epoch_ms(since) if since is not None else None,
+            'until': to_epoch_ms(until) if until is not None else None,
+            'after_id': after_id,
+            'until_id': until_id
+        }
+    
+    def _read_segment(self, path: str, filters: dict, listed: list = ()):
+        """Записи одного сегмента: (id, entry) по возрастанию ID"""
+        if path.endswith('.db'):
+            return self._select(path, filters, listed)
+        return self._scan_archive(path, filters)
+    
+    def _select(self, path: str, filters: dict, listed: list = ()):
+        """Горячий сегмент: выборка по индексам SQLite"""
+        conditions = []
+        params = []
+        
+        for column in FILTER_COLUMNS:
+            if filters[column] is not None:
+                conditions.append(f'{column} = ?')
+                params.append(filters[column])
+        
+        for column, operator, key in (('ts', '>', 'since'), ('ts', '<=', 'until'),
+                                       ('id', '>', 'after_id'), ('id', '<=', 'until_id')):
+            if filters[key] is not None:
+                conditions.append(f'{column} {operator} ?')
+                params.append(filters[key])
+        
+        sql = 'SELECT id, record FROM events'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY id'
+        
+        try:
+            conn = self._open_ro(path)
+        except sqlite3.OperationalError:
+            # Сегмент сжали после того, как он попал в список - читаем архив,
+            # если его еще нет в выборке; удаленный по сроку просто пропускаем
+            cold_path = self._archived_path(path)
+            if cold_path is not None and cold_path not in listed:
+                yield from self._scan_archive(cold_path, filters)
+            return
+        
+        try:
+            for row_id, record in conn.execute(sql, params):
+                yield row_id, json.loads(record)
+        finally:
+            conn.close()
+    
+    def _scan_archive(self, path: str, filters: dict, blocks: list = None):
+        """Холодный сегмент: распаковка только подходящих по индексу блоков"""
+        open_archive = ARCHIVE_CODECS[path.rsplit('.', 1)[1]]
+        if blocks is None:
+            blocks = self._load_index(path)
+        
+        with open(path, 'rb') as raw:
+            if blocks is None:
+                # Архив без индекса - читаем целиком, но потоково
+                with open_archive(raw, 'rt', encoding='utf-8') as f:
+                    yield from self._filter_lines(f, filters)
+                return
+            
+            for block in blocks:
+                if not self._block_matches(block, filters):
+                    continue
+                raw.seek(block['offset'])
+                data = io.BytesIO(raw.read(block['size']))
+                with open_archive(data, 'rt', encoding='utf-8') as f:
+                    yield from self._filter_lines(f, filters)
+    
+    def _filter_lines(self, lines, filters: dict):
+        """Фильтрация строк холодного сегмента"""
+        for line in lines:
+            row = json.loads(line)
+            if any(filters[column] is not None and row.get(column) != filters[column]
+                   for column in FILTER_COLUMNS):
+                continue
+            if filters['since'] is not None and row['ts'] <= filters['since']:
+                continue
+            if filters['until'] is not None and row['ts'] > filters['until']:
+                continue
+            if filters['after_id'] is not None and row['id'] <= filters['after_id']:
+                continue
+            if filters['until_id'] is not None and row['id'] > filters['until_id']:
+                continue
+            yield row['id'], row['record']
+    
+    def _block_matches(self, block: dict, filters: dict) -> bool:
+        """Может ли блок содержать подходящие записи (границы None - неизвестны)"""
+        if filters['since'] is not None and block.get('max_ts') is not None and block['max_ts'] <= filters['since']:
+            return False
+        if filters['until'] is not None and block.get('min_ts') is not None and block['min_ts'] > filters['until']:
+            return False
+        if filters['after_id'] is not None and block.get('last_id') is not None and block['last_id'] <= filters['after_id']:
+            return False
+        if filters['until_id'] is not None and block.get('first_id') is not None and block['first_id'] > filters['until_id']:
+            return False
+        if filters['source'] is not None and 'sources' in block:
+            summary = block['sources'].get(filters['source'])
+            if summary is None:
+                return False
+            if filters['since'] is not None and summary['max_ts'] <= filters['since']:
+                return False
+            if filters['after_id'] is not None and summary['last_id'] <= filters['after_id']:
+                return False
+        return True
+    
+    def _load_index(self, path: str):
+        """Разреженный индекс архива или None, если его нет"""
+        try:
+            with open(path + '.idx', 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return None
+    
+    # ============================================================
+    # СЖАТИЕ ХОЛОДНЫХ СЕГМЕНТОВ (вне горячего пути)
+    # ============================================================
+    
+    def archive(self, older_than_days: int, codec: str = 'gz') -> int:
+        """
+        Сжать сегменты старше older_than_days дней в JSON Lines + gzip/lzma.
+        Каждые INDEX_INTERVAL строк - отдельный сжатый блок, его смещение
+        и границы ts/ID пишутся в индекс .idx.
+        """
+        cutoff = date.today() - timedelta(days=older_than_days)
+        archived = 0
+        
+        self._upgrade_indexes()
+        
+        for day, label, path in self.segments():
+            if day >= cutoff or not path.endswith('.db'):
+                continue
+            
+            if not self._has_events_table(path):
+                # Пустой файл без таблицы (создан чтением уже сжатого сегмента) - убираем
+                self._remove_files(path, ('', '-wal', '-shm'))
+                continue
+            
+            archive_path = path[:-len('.db')] + f'.jsonl.{codec}'
+            tmp_file = archive_path + '.tmp'
+            blocks = []
+            
+            # В этот день уже есть архив (догрузка старых записей) - дописываем
+            # новые блоки: склеенные потоки gzip/lzma читаются как один файл
+            if os.path.exists(archive_path):
+                shutil.copyfile(archive_path, tmp_file)
+                blocks = self._load_index(archive_path)
+                if blocks is None:
+                    blocks = [{'offset': 0, 'size': os.path.getsize(archive_path)}]
+            
+            conn = self._open_ro(path)
+            try:
+                with open(tmp_file, 'ab') as raw:
+                    rows = conn.execute(
+                        'SELECT id, source, ts, type, user_id, target_id, channel_id, record '
+                        'FROM events ORDER BY id'
+                    )
+                    while True:
+                        chunk = rows.fetchmany(INDEX_INTERVAL)
+                        if not chunk:
+                            break
+                        blocks.append(self._write_block(raw, chunk, codec))
+                    raw.flush()
+                    os.fsync(raw.fileno())
+            finally:
+                conn.close()
+            
+            with open(tmp_file + '.idx', 'w', encoding='utf-8') as f:
+                for block in blocks:
+                    f.write(json.dumps(block) + '\n')
+            
+            with self._segments_lock:
+                os.replace(tmp_file + '.idx', archive_path + '.idx')
+                os.replace(tmp_file, archive_path)
+                self._remove_files(path, ('', '-wal', '-shm'))
+            archived += 1
+        
+        return archived
+    
+    def _has_events_table(self, path: str) -> bool:
+        conn = self._open_ro(path)
+        try:
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events'"
+            ).fetchone() is not None
+        finally:
+            conn.close()
+    
+    def _write_block(self, raw, rows: list, codec: str) -> dict:
+        """Записать блок строк отдельным сжатым потоком, вернуть запись индекса"""
+        offset = raw.tell()
+        with ARCHIVE_CODECS[codec](raw, 'wb') as f:
+            f.write(''.join(self._archive_line(row) for row in rows).encode('utf-8'))
+        
+        return {
+            'offset': offset,
+            'size': raw.tell() - offset,
+            'first_id': rows[0][0],
+            'last_id': rows[-1][0],
+            'min_ts': min(row[2] for row in rows),
+            'max_ts': max(row[2] for row in rows),
+            'sources': self._sources_summary((row[0], row[1], row[2]) for row in rows)
+        }
+    
+    def _sources_summary(self, rows) -> dict:
+        """Сводка блока по источникам из (id, source, ts): границы ID/ts и число записей"""
+        sources = {}
+        for row_id, source, ts in rows:
+            summary = sources.get(source)
+            if summary is None:
+                sources[source] = {'first_id': row_id, 'last_id': row_id, 'count': 1, 'min_ts': ts, 'max_ts': ts}
+                continue
+            summary['first_id'] = min(summary['first_id'], row_id)
+            summary['last_id'] = max(summary['last_id'], row_id)
+            summary['count'] += 1
+            summary['min_ts'] = min(summary['min_ts'], ts)
+            summary['max_ts'] = max(summary['max_ts'], ts)
+        return sources
+    
+    def _upgrade_indexes(self) -> None:
+        """Дописать сводку по источникам в индексы архивов, сжатых до ее появления (один раз)"""
+        for day, label, path in self.segments():
+            if path.endswith('.db'):
+                continue
+            blocks = self._load_index(path)
+            if blocks is None:
+                blocks = [{'offset': 0, 'size': os.path.getsize(path)}]
+            elif all('sources' in block for block in blocks):
+                continue
+            
+            open_archive = ARCHIVE_CODECS[path.rsplit('.', 1)[1]]
+            try:
+                with open(path, 'rb') as raw:
+                    for block in blocks:
+                        if 'sources' in block:
+                            continue
+                        raw.seek(block['offset'])
+                        data = io.BytesIO(raw.read(block['size']))
+                        with open_archive(data, 'rt', encoding='utf-8') as f:
+                            rows = [json.loads(line) for line in f]
+                        block['sources'] = self._sources_summary((row['id'], row['source'], row['ts']) for row in rows)
+                
+                tmp_file = path + '.idx.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    for block in blocks:
+                        f.write(json.dumps(block) + '\n')
+                os.replace(tmp_file, path + '.idx')
+            except (OSError, ValueError, EOFError) as e:
+                print(f"❌ Ошибка обновления индекса {path}: {e}")
+    
+    def _archive_line(self, row: tuple) -> str:
+        """Строка холодного сегмента: индексируемые поля + исходная запись"""
+        row_id, source, ts, log_type, user_id, target_id, channel_id, record = row
+        return json.dumps({
+            'id': row_id,
+            'source': source,
+            'ts': ts,
+            'type': log_type,
+            'user_id': user_id,
+            'target_id': target_id,
+            'channel_id': channel_id,
+            'record': json.loads(record)
+        }, ensure_ascii=False) + '\n'
+    
+    # ============================================================
+    # ИСТЕЧЕНИЕ СРОКА ХРАНЕНИЯ (вне горячего пути)
+    # ============================================================
+    
+    def expire(self) -> int:
+        """Удалить сегменты с истекшим сроком хранения - целыми файлами"""
+        today = date.today()
+        removed = 0
+        
+        for day, label, path in self.segments():
+            if label == FOREVER or not label.startswith('d'):
+                continue
+            if day + timedelta(days=int(label[1:])) >= today:
+                continue
+            
+            try:
+                self._remove_files(path, ('', '-wal', '-shm', '.idx'))
+                removed += 1
+            except OSError as e:
+                # Сегмент сейчас читается - удалим при следующем запуске
+                print(f"❌ Не удалось удалить сегмент {path}: {e}")
+        
+        return removed
+    
+    def _remove_files(self, path: str, suffixes: tuple) -> None:
+        """Удалить файл сегмента и его спутники (под блокировкой списка сегментов)"""
+        with self._segments_lock:
+            for suffix in suffixes:
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
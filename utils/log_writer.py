@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Фоновая запись логов Price FamQ Bot (write-behind очередь с групповой записью)
+"""
+import queue
+import threading
+import time
+
+
+_STOP = object()
+
+
+class LogWriter:
+    """
+    Ограниченная очередь записей, которую разбирает фоновый поток.
+    Записи копятся до batch_size штук или до flush_interval секунд
+    и пишутся в хранилище одной транзакцией.
+    """
+    
+    def __init__(self, store, flush_interval: float = 0.5, batch_size: int = 500,
+                 queue_size: int = 10000):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+    
+    def put(self, source: str, entry) -> None:
+        """Поставить запись в очередь (не делает файлового I/O и никогда не ждет)"""
+        try:
+            self._queue.put_nowait((source, entry))
+        except queue.Full:
+            # Вызывается из цикла событий: ждать места нельзя, запись теряется сразу
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"❌ Очередь логов переполнена, запись потеряна (всего: {self.dropped})")
+    
+    def flush(self) -> None:
+        """Дождаться записи всего, что уже стоит в очереди (блокирующий вызов)"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+    
+    def close(self) -> None:
+        """Записать остаток очереди и остановить поток"""
+        self._queue.put(_STOP)
+        self._thread.join()
+    
+    def _run(self):
+        """Цикл фонового потока"""
+        running = True
+        
+        while running:
+            batch = []
+            waiters = []
+            deadline = None
+            
+            # Добираем пачку до лимита размера или времени
+            while len(batch) < self.batch_size:
+                if deadline is None:
+                    item = self._queue.get()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                
+                if item is _STOP:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    # flush(): пишем сразу всё, что набрали до маркера
+                    waiters.append(item)
+                    break
+                
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            
+            self._write_batch(batch)
+            
+            for done in waiters:
+                done.set()
+    
+    def _write_batch(self, batch):
+        """Групповая запись: одна транзакция на пачку"""
+        if not batch:
+            return
+        
+        try:
+            self.store.append_many(batch)
+        except Exception as e:
+            print(f"❌ Ошибка записи логов ({len(batch)} записей): {e}")
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш содержимого сообщений Price FamQ Bot для логов удаления и редактирования
+"""
+import time
+from collections import OrderedDict
+
+
+class CachedMessage:
+    """Снимок сообщения: только то, что нужно логам (без объекта discord.Message)"""
+    
+    __slots__ = (
+        'id', 'channel_id', 'guild_id', 'author_id', 'author_name', 'author_bot',
+        'content', 'attachments', 'embeds_count', 'mentions', 'edited_at', 'cached_at'
+    )
+    
+    def __init__(self, message, content_limit: int = 2000):
+        self.id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id if message.guild else None
+        self.author_id = message.author.id
+        self.author_name = str(message.author)
+        self.author_bot = message.author.bot
+        # Сообщения ботов не логируются - храним только отметку
+        self.content = '' if self.author_bot else message.content[:content_limit]
+        self.attachments = () if self.author_bot else tuple(att.filename for att in message.attachments)
+        self.embeds_count = len(message.embeds)
+        self.mentions = () if self.author_bot else tuple(str(m) for m in message.mentions[:5])
+        # Время последней правки текста, которую видел кэш (None - не редактировалось)
+        self.edited_at = message.edited_at
+        self.cached_at = time.monotonic()
+
+
+class MessageCache:
+    """
+    Ограниченный кэш снимков сообщений: не больше max_size штук (вытесняются
+    давно не использованные) и не старше ttl секунд.
+    Позволяет логировать удаление/редактирование сообщений, которых нет
+    во внутреннем кэше discord.py (после перезапуска, старые сообщения)
+    """
+    
+    def __init__(self, max_size: int = 5000, ttl: float = 86400, content_limit: int = 2000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.content_limit = content_limit
+        self._messages = OrderedDict()
+        # ID сообщений из массовых удалений (чтобы не логировать их еще и поштучно)
+        self._bulk_ids = OrderedDict()
+    
+    def add(self, message) -> CachedMessage:
+        """Запомнить сообщение (или обновить снимок после редактирования)"""
+        snapshot = CachedMessage(message, self.content_limit)
+        self._messages[snapshot.id] = snapshot
+        self._messages.move_to_end(snapshot.id)
+        
+        while len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+        return snapshot
+    
+    def get(self, message_id: int):
+        """Снимок сообщения или None (нет в кэше или истек срок)"""
+        snapshot = self._messages.get(message_id)
+        if snapshot is None:
+            return None
+        if time.monotonic() - snapshot.cached_at > self.ttl:
+            del self._messages[message_id]
+            return None
+        
+        self._messages.move_to_end(message_id)
+        return snapshot
+    
+    def pop(self, message_id: int):
+        """Забрать снимок удаленного сообщения"""
+        snapshot = self.get(message_id)
+        if snapshot is not None:
+            del self._messages[message_id]
+        return snapshot
+    
+    def update_content(self, message_id: int, content: str, edited_at=None):
+        """Новый текст и время правки после редактирования"""
+        snapshot = self._messages.get(message_id)
+        if snapshot is not None:
+            snapshot.content = content[:self.content_limit]
+            snapshot.edited_at = edited_at
+    
+    def pop_bulk(self, message_ids) -> list:
+        """Забрать снимки пачки массово удаленных сообщений (найденные в кэше) и запомнить ID пачки"""
+        snapshots = []
+        for message_id in message_ids:
+            self._bulk_ids[message_id] = None
+            snapshot = self.pop(message_id)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        
+        while len(self._bulk_ids) > self.max_size:
+            self._bulk_ids.popitem(last=False)
+        return snapshots
+    
+    def in_bulk(self, message_id: int) -> bool:
+        """Сообщение уже учтено в массовом удалении"""
+        return message_id in self._bulk_ids
@@ -10,6 +10,10 @@ class PermissionChecker:
     def __init__(self):
         self.config = ConfigManager()
     
+    def _has_role(self, user, role_ids: frozenset) -> bool:
+        """Есть ли у пользователя хотя бы одна роль из role_ids"""
+        return any(role.id in role_ids for role in user.roles)
+    
     def get_user_role_ids(self, user):
         """Получить список ID ролей пользователя"""
         return [role.id for role in user.roles]
@@ -20,9 +24,7 @@ class PermissionChecker:
     
     def is_owner(self, user) -> bool:
         """Проверка: является ли пользователь Owner"""
-        owner_role_ids = self.config.get('owner_role_ids', [])
-        user_role_ids = self.get_user_role_ids(user)
-        return any(role_id in user_role_ids for role_id in owner_role_ids)
+        return self._has_role(user, self.config.snapshot.owner_role_ids)
     
     # ============================================================
     # УРОВЕНЬ АДМИНИСТРАЦИИ
@@ -30,27 +32,19 @@ class PermissionChecker:
     
     def is_dep_owner(self, user) -> bool:
         """Проверка: является ли пользователь Dep.Owner"""
-        dep_owner_role_ids = self.config.get('dep_owner_role_ids', [])
-        user_role_ids = self.get_user_role_ids(user)
-        return any(role_id in user_role_ids for role_id in dep_owner_role_ids)
+        return self._has_role(user, self.config.snapshot.dep_owner_role_ids)
     
     def is_developer(self, user) -> bool:
         """Проверка: является ли пользователь Developer"""
-        dev_role_ids = self.config.get('dev_role_ids', [])
-        user_role_ids = self.get_user_role_ids(user)
-        return any(role_id in user_role_ids for role_id in dev_role_ids)
+        return self._has_role(user, self.config.snapshot.dev_role_ids)
     
     def is_contract_manager(self, user) -> bool:
         """Проверка: является ли пользователь Contract"""
-        contract_role_id = self.config.get('contract_role_id', 0)
-        user_role_ids = self.get_user_role_ids(user)
-        return contract_role_id in user_role_ids
+        return self._has_role(user, self.config.snapshot.contract_role_ids)
     
     def is_moderator(self, user) -> bool:
         """Проверка: является ли пользователь REC (модератор)"""
-        moderator_role_ids = self.config.get('moderator_role_ids', [])
-        user_role_ids = self.get_user_role_ids(user)
-        return any(role_id in user_role_ids for role_id in moderator_role_ids)
+        return self._has_role(user, self.config.snapshot.moderator_role_ids)
     
     # ============================================================
     # КОМПЛЕКСНЫЕ ПРОВЕРКИ ДЛЯ ФУНКЦИЙ